@@ -0,0 +1,145 @@
+# Solve many boards without a window, spread over a pool of processes:
+#
+#   python batch.py [FILE] [--solver NAME] [--width N] [--processes N]
+#                   [--chunksize N] [--max-nodes N] [--max-seconds S]
+#                   [--stats] [--timing] [--cache FILE] [--weight W]
+#
+# FILE (stdin if left out) holds one board per line, either as its numbers in
+# row-major order with 0 for the blank ("1 2 3 4 5 6 7 0 8"), or as JSON: a
+# list of numbers or of rows, or an object with a "board" key and optional
+# "id", "solver", "width" and "weight" keys. Boards given as rows have the size of the
+# rows; the width of a flat board is its "width" key, --width, or else the
+# board is taken to be square. One JSON result per board is written to stdout, in
+# the same order as the input. Moves are named like in the game: the
+# direction in which the tile next to the blank slides. --stats adds the
+# search's SearchStats to every result, --timing also its phase times.
+# --cache answers boards from, and adds optimal solutions to, a SolutionCache
+# database shared by all processes and kept between runs. The arastar solver
+# starts from --weight (or the board's "weight") and, when a budget stops it,
+# returns the best solution it found with its "suboptimality", the factor by
+# which it may be longer than optimal.
+import argparse, functools, json, math, multiprocessing, os, sys, time
+import solver
+
+
+def parseLine(line, defaultWidth=None):
+    # Return the request object of one input line, the board's cells in
+    # row-major order and the Puzzle of its size.
+    if line.startswith("{") or line.startswith("["):
+        request = json.loads(line)
+        if isinstance(request, list):
+            request = {"board": request}
+    else:
+        request = {"board": [int(cell) for cell in line.replace(",", " ").split()]}
+    cells = request["board"]
+    width = request.get("width", defaultWidth)
+    if cells and isinstance(cells[0], list):
+        width = len(cells[0])
+        cells = [cell for row in cells for cell in row]
+    if width is None:
+        width = math.isqrt(len(cells))
+        if width * width != len(cells):
+            raise ValueError("a board of %d numbers is not square, give its width" % len(cells))
+    if width < 1 or len(cells) % width:
+        raise ValueError("%d numbers don't make a board %d wide" % (len(cells), width))
+    return request, cells, solver.getPuzzle(width, len(cells) // width)
+
+
+CACHE = None # this process's SolutionCache, opened on first use
+
+
+def solveLine(job):
+    global CACHE
+    lineNumber, line, options = job
+    result = {"line": lineNumber}
+    try:
+        request, cells, puzzle = parseLine(line, options["width"])
+        if "id" in request:
+            result["id"] = request["id"]
+        solverName = request.get("solver", options["solver"])
+        if solverName not in solver.SOLVERS:
+            raise ValueError("unknown solver %r" % solverName)
+        if solverName == "table" and solver.getDistanceTable(puzzle) is None:
+            raise ValueError("the table solver needs a 3x3 board and the table built with build-dist")
+        if solverName == "layerbfs" and not solver.layerBoardsFit(puzzle):
+            raise ValueError("the layerbfs solver needs NumPy and a board of at most 16 cells")
+        if solverName == "hdastar" and multiprocessing.current_process().daemon:
+            raise ValueError("the hdastar solver starts processes of its own, run it with --processes 1")
+        search = solver.SOLVERS[solverName]
+        if solverName == "arastar":
+            search = functools.partial(search, weight=float(request.get("weight", options["weight"])))
+        init_state = solver.parseBoard(puzzle, cells)
+    except (ValueError, KeyError, TypeError) as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        return result
+
+    control = solver.SearchControl(maxNodes=options["maxNodes"], maxSeconds=options["maxSeconds"])
+    stats = solver.SearchStats(timing=options["timing"]) if options["stats"] else None
+    startTime = time.perf_counter()
+    if options["cache"]:
+        if CACHE is None:
+            CACHE = solver.SolutionCache(options["cache"])
+        searchResult = solver.cachedSolve(CACHE, search, puzzle, init_state, control, stats)
+    else:
+        searchResult = search(puzzle, init_state, control, stats)
+    result["status"] = searchResult.status
+    if searchResult.moves is not None:
+        result["length"] = len(searchResult.moves)
+        result["moves"] = searchResult.moves
+        if searchResult.suboptimality != 1.0:
+            result["suboptimality"] = round(searchResult.suboptimality, 6)
+    result["expanded"] = searchResult.expanded
+    result["duplicates"] = searchResult.duplicates
+    result["seconds"] = round(time.perf_counter() - startTime, 6)
+    if stats is not None:
+        result["stats"] = stats.asDict()
+    return result
+
+
+def readJobs(lines, options):
+    # Number the non-empty input lines, without reading ahead of the pool.
+    for lineNumber, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            yield (lineNumber, line, options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve slide puzzles in batch.")
+    parser.add_argument("file", nargs="?", help="input file, stdin if left out")
+    parser.add_argument("--solver", default="idastar", choices=sorted(solver.SOLVERS))
+    parser.add_argument("--width", type=int, help="width of the boards given as flat lists")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--max-nodes", type=int)
+    parser.add_argument("--max-seconds", type=float)
+    parser.add_argument("--stats", action="store_true", help="add search statistics to the results")
+    parser.add_argument("--timing", action="store_true", help="with --stats, also time the phases of the search")
+    parser.add_argument("--cache", help="SQLite file of solutions to reuse and extend")
+    parser.add_argument("--weight", type=float, default=solver.ARAWEIGHT, help="first weight of the arastar solver")
+    args = parser.parse_args(argv)
+
+    options = {
+        "solver": args.solver,
+        "width": args.width,
+        "maxNodes": args.max_nodes,
+        "maxSeconds": args.max_seconds,
+        "stats": args.stats or args.timing,
+        "timing": args.timing,
+        "cache": args.cache,
+        "weight": args.weight,
+    }
+    lines = open(args.file) if args.file else sys.stdin
+    jobs = readJobs(lines, options)
+    if args.processes == 1:
+        for result in map(solveLine, jobs):
+            print(json.dumps(result), flush=True)
+    else:
+        with multiprocessing.Pool(args.processes) as pool:
+            for result in pool.imap(solveLine, jobs, args.chunksize):
+                print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# Reproducible solver benchmarks:
+#
+#   python bench.py [--solvers astar,idastar] [--sets 8-puzzle,korf100]
+#                   [--korf100 FILE] [--per-bucket N] [--seed N]
+#                   [--max-seconds S] [--timing] [--output results.json]
+#   python bench.py --compare old.json new.json [--threshold 0.10]
+#
+# Korf's 100 15-puzzles are read from korf100.txt; every other instance set
+# is made by generate.py from the seed, so two runs with the same arguments
+# solve the same boards. Every instance has a known optimal length. Each
+# (solver, instance) pair runs in a fresh process so that its peak RSS
+# (including that of any worker processes the solver starts) can be
+# measured on its own. The results
+# written with --output can be compared across commits with --compare, which
+# exits with status 1 if a solver got slower, expanded more nodes or stopped
+# returning optimal solutions.
+import argparse, json, multiprocessing, os, platform, random, resource, subprocess, sys, time
+import generate, solver
+
+# Optimal solution lengths of the 8-puzzle instances, in buckets.
+DEPTHBUCKETS = ((0, 9), (10, 14), (15, 19), (20, 24), (25, 31))
+# Number of 8-puzzles at each optimal length from 0 to 31.
+LAYERSIZES = (1, 2, 4, 8, 16, 20, 39, 62, 116, 152, 286, 396, 748, 1024, 1893, 2512, 4485,
+              5638, 9529, 10878, 16993, 17110, 23952, 20224, 24047, 15578, 14560, 6274, 3910, 760, 221, 2)
+
+# Searches without a heuristic can't finish on the larger boards.
+HEURISTICSOLVERS = ("astar", "idastar", "hdastar", "arastar")
+
+KORF100FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "korf100.txt")
+
+# Sets of larger boards that all have the same optimal length: (width,
+# height, length) by name.
+LENGTHSETS = {
+    "15-puzzle-40": (4, 4, 40),
+    "24-puzzle-36": (5, 5, 36),
+}
+
+
+def eightPuzzleSet(perBucket, rng):
+    # perBucket boards for every bucket of DEPTHBUCKETS, with optimal lengths
+    # drawn evenly from the bucket.
+    puzzle = solver.getPuzzle(3, 3)
+    instances = []
+    for low, high in DEPTHBUCKETS:
+        found = 0
+        seen = set()
+        while found < perBucket:
+            optimal = rng.randint(low, high)
+            cells = generate.generateBoard(puzzle, optimal, rng)
+            if tuple(cells) in seen:
+                continue # the shortest buckets hold only a few boards
+            seen.add(tuple(cells))
+            instances.append({"name": "d%02d-%02d/%d" % (low, high, found), "cells": cells, "optimal": optimal})
+            found += 1
+    return {"name": "8-puzzle", "width": 3, "height": 3, "instances": instances}
+
+
+def readKorf100(fileName):
+    # Korf's 100 random 15-puzzle instances, one per line as "number tiles...
+    # [optimal length]" (anything after that is ignored), with his goal, which
+    # has the blank in the top left corner. Turning a board by 180 degrees
+    # maps his goal onto ours without changing any distance, so the tiles are
+    # turned around on the way in.
+    instances = []
+    with open(fileName) as f:
+        for line in f:
+            numbers = [int(number) for number in line.split()]
+            if not numbers:
+                continue
+            tiles = numbers[1:17]
+            optimal = numbers[17] if len(numbers) > 17 else None
+            cells = [16 - tile if tile else 0 for tile in reversed(tiles)]
+            instances.append({"name": str(numbers[0]), "cells": cells, "optimal": optimal})
+    return {"name": "korf100", "width": 4, "height": 4, "instances": instances}
+
+
+def lengthSet(name, width, height, count, length, rng):
+    # count boards whose optimal solution is length moves.
+    puzzle = solver.getPuzzle(width, height)
+    instances = []
+    for i in range(count):
+        instances.append({"name": str(i), "cells": generate.generateBoard(puzzle, length, rng), "optimal": length})
+    return {"name": name, "width": width, "height": height, "instances": instances}
+
+
+def makeSets(names, args):
+    sets = []
+    for name in names:
+        # every set gets its own generator so that adding a set doesn't change the others
+        rng = random.Random("%s/%s" % (args.seed, name))
+        if name == "8-puzzle":
+            sets.append(eightPuzzleSet(args.per_bucket, rng))
+        elif name == "korf100":
+            sets.append(readKorf100(args.korf100))
+        elif name in LENGTHSETS:
+            width, height, length = LENGTHSETS[name]
+            sets.append(lengthSet(name, width, height, args.per_bucket, length, rng))
+        else:
+            raise SystemExit("unknown instance set %r" % name)
+    return sets
+
+
+def runInstance(solverName, width, height, cells, maxSeconds, timing):
+    # Runs in a fresh worker process, see benchmark(). Collecting the stats
+    # costs a little time, so the searches are timed without them unless
+    # the phases are to be timed too.
+    puzzle = solver.getPuzzle(width, height)
+    control = solver.SearchControl(maxSeconds=maxSeconds)
+    stats = solver.SearchStats(timing=True) if timing else None
+    startTime = time.perf_counter()
+    result = solver.SOLVERS[solverName](puzzle, solver.parseBoard(puzzle, cells), control, stats)
+    seconds = time.perf_counter() - startTime
+    row = {
+        "status": result.status,
+        "length": None if result.moves is None else len(result.moves),
+        "seconds": seconds,
+        "expanded": result.expanded,
+        "generated": result.generated,
+        "duplicates": result.duplicates,
+        "peakRSS": max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024,
+    }
+    if stats is not None:
+        row["stats"] = stats.asDict()
+    return row
+
+
+def runInstanceProcess(connection, *args):
+    connection.send(runInstance(*args))
+    connection.close()
+
+
+def runIsolated(*args):
+    # Run runInstance in a new process of its own. Unlike a Pool worker it is
+    # not daemonic, so the solver may start processes too.
+    receiver, sender = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(target=runInstanceProcess, args=(sender,) + args)
+    process.start()
+    sender.close()
+    row = receiver.recv()
+    process.join()
+    return row
+
+
+def summarize(rows):
+    seconds = sum(row["seconds"] for row in rows)
+    expanded = sum(row["expanded"] for row in rows)
+    return {
+        "instances": len(rows),
+        "solved": sum(1 for row in rows if row["status"] == solver.SOLVED),
+        "optimal": sum(1 for row in rows if row["optimal"] is True),
+        "suboptimal": sum(1 for row in rows if row["optimal"] is False),
+        "seconds": seconds,
+        "expanded": expanded,
+        "nodesPerSecond": expanded / seconds if seconds else 0.0,
+        "peakRSS": max(row["peakRSS"] for row in rows),
+    }
+
+
+def benchmark(solverNames, sets, maxSeconds, timing):
+    rows = []
+    summaries = []
+    for instanceSet in sets:
+        puzzle = solver.getPuzzle(instanceSet["width"], instanceSet["height"])
+        for solverName in solverNames:
+            if puzzle.numCells > 9 and solverName not in HEURISTICSOLVERS:
+                continue
+            if solverName == "table" and solver.getDistanceTable(puzzle) is None:
+                continue
+            if solverName == "layerbfs" and not solver.layerBoardsFit(puzzle):
+                continue
+            setRows = []
+            for instance in instanceSet["instances"]:
+                row = runIsolated(solverName, puzzle.width, puzzle.height, instance["cells"], maxSeconds, timing)
+                row["solver"] = solverName
+                row["set"] = instanceSet["name"]
+                row["instance"] = instance["name"]
+                row["optimal"] = None
+                if instance["optimal"] is not None and row["length"] is not None:
+                    row["optimal"] = row["length"] == instance["optimal"]
+                setRows.append(row)
+            summary = summarize(setRows)
+            summary["solver"] = solverName
+            summary["set"] = instanceSet["name"]
+            print("%-8s %-16s %3d/%-3d solved %3d optimal %9.3fs %10d nodes %9.0f nodes/s %6.1f MB" % (
+                solverName, instanceSet["name"], summary["solved"], summary["instances"], summary["optimal"],
+                summary["seconds"], summary["expanded"], summary["nodesPerSecond"], summary["peakRSS"] / 2 ** 20))
+            rows.extend(setRows)
+            summaries.append(summary)
+    return rows, summaries
+
+
+def gitCommit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(oldFile, newFile, threshold):
+    # Print how every (solver, set) summary changed and return the number of
+    # regressions.
+    with open(oldFile) as f:
+        old = {(summary["solver"], summary["set"]): summary for summary in json.load(f)["summaries"]}
+    with open(newFile) as f:
+        new = {(summary["solver"], summary["set"]): summary for summary in json.load(f)["summaries"]}
+    regressions = 0
+    for key in sorted(set(old) & set(new)):
+        before, after = old[key], new[key]
+        problems = []
+        for field in ("seconds", "expanded", "peakRSS"):
+            if before[field] and after[field] > before[field] * (1 + threshold):
+                problems.append("%s +%.0f%%" % (field, 100.0 * (after[field] / before[field] - 1)))
+        if after["solved"] < before["solved"]:
+            problems.append("solved %d -> %d" % (before["solved"], after["solved"]))
+        if after["suboptimal"] > before["suboptimal"]:
+            problems.append("suboptimal %d -> %d" % (before["suboptimal"], after["suboptimal"]))
+        print("%-8s %-16s %9.3fs -> %9.3fs %10d -> %10d nodes  %s" % (
+            key[0], key[1], before["seconds"], after["seconds"], before["expanded"], after["expanded"],
+            "REGRESSION: " + ", ".join(problems) if problems else "ok"))
+        if problems:
+            regressions += 1
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the slide puzzle solvers.")
+    parser.add_argument("--solvers", default=",".join(sorted(solver.SOLVERS)))
+    parser.add_argument("--sets", default="8-puzzle,korf100,15-puzzle-40,24-puzzle-36")
+    parser.add_argument("--korf100", default=KORF100FILE, help="file with Korf's 100 15-puzzle instances")
+    parser.add_argument("--per-bucket", type=int, default=5, help="instances per 8-puzzle depth bucket and per fixed length set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-seconds", type=float, default=60.0, help="time budget of a single solve")
+    parser.add_argument("--timing", action="store_true", help="record search statistics and phase times")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown --compare reports")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    solverNames = args.solvers.split(",")
+    for solverName in solverNames:
+        if solverName not in solver.SOLVERS:
+            parser.error("unknown solver %r" % solverName)
+    if "8-puzzle" in args.sets.split(","):
+        for low, high in DEPTHBUCKETS:
+            if args.per_bucket > sum(LAYERSIZES[low:high + 1]):
+                parser.error("there are only %d 8-puzzles %d-%d moves from the goal, use a smaller --per-bucket" % (sum(LAYERSIZES[low:high + 1]), low, high))
+    sets = makeSets(args.sets.split(","), args)
+    rows, summaries = benchmark(solverNames, sets, args.max_seconds, args.timing)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": gitCommit(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "arguments": vars(args),
+                "summaries": summaries,
+                "results": rows,
+            }, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# Breadth-first enumeration of every board of a puzzle, layer by layer from
+# the goal, that keeps the layers on disk instead of in memory:
+#
+#   python extbfs.py run DIR [--width W] [--height H] [--max-memory MB]
+#                    [--max-depth N]
+#   python extbfs.py lookup DIR TILES...
+#
+# Layer d, every board at distance d from the goal, is the file
+# DIR/layer-ddd.bin of sorted fixed-size records (the packed board as
+# solver.packedKey() writes it). The next layer is made in runs: the
+# children of as many boards as fit in --max-memory are sorted, cleared of
+# repeats and written to a run file, then all runs are merged in one
+# streaming pass that also drops the boards of the layer before (a child is
+# never in its parent's layer, see solver.layerBFS). Every file is read and
+# written front to back in blocks of BLOCKRECORDS records. DIR/progress.json
+# is replaced after each layer, so a run that is stopped and started again
+# goes on after the last complete layer. lookup finds the distance of a
+# board, given by its tiles in row-major order with 0 for the blank, by
+# binary search in the layer files.
+import argparse, heapq, json, os, sys
+import solver
+
+BYTESPERBOARD = 100 # memory a board takes in a run before it is written, roughly
+BLOCKRECORDS = 1 << 14 # records read or written at a time
+MAXRUNS = 64 # run files merged in one pass
+
+
+def recordSize(puzzle):
+    return (puzzle.numCells * puzzle.tileBits + 7) // 8
+
+
+def layerFile(directory, depth):
+    return os.path.join(directory, "layer-%03d.bin" % depth)
+
+
+def readBoards(fileName, size):
+    # Yield the boards of a file of records.
+    with open(fileName, "rb") as f:
+        while True:
+            block = f.read(size * BLOCKRECORDS)
+            if not block:
+                return
+            for offset in range(0, len(block), size):
+                yield int.from_bytes(block[offset:offset + size], "big")
+
+
+def writeBoards(fileName, boards, size):
+    # Write sorted boards without repeats and return how many there were.
+    # The file only gets its name once it is complete.
+    count = 0
+    previous = None
+    block = []
+    with open(fileName + ".tmp", "wb") as f:
+        for board in boards:
+            if board == previous:
+                continue
+            previous = board
+            block.append(board.to_bytes(size, "big"))
+            count += 1
+            if len(block) == BLOCKRECORDS:
+                f.write(b"".join(block))
+                block = []
+        f.write(b"".join(block))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(fileName + ".tmp", fileName)
+    return count
+
+
+def subtract(boards, seen):
+    # Yield the sorted boards that are not in the sorted stream seen.
+    seen = iter(seen)
+    other = next(seen, None)
+    for board in boards:
+        while other is not None and other < board:
+            other = next(seen, None)
+        if board != other:
+            yield board
+
+
+def writeRun(directory, runs, buffer, size):
+    name = os.path.join(directory, "run-%04d.bin" % len(runs))
+    buffer.sort()
+    writeBoards(name, buffer, size)
+    runs.append(name)
+
+
+def writeRuns(puzzle, directory, depth, maxMemory):
+    # Expand layer depth into sorted run files and return their names.
+    size = recordSize(puzzle)
+    limit = max(1, maxMemory // BYTESPERBOARD)
+    runs = []
+    buffer = []
+    for board in readBoards(layerFile(directory, depth), size):
+        blank = solver.boardTiles(puzzle, board).index(0)
+        for move, newBlank in puzzle.neighbors[blank]:
+            buffer.append(solver.slideTile(puzzle, board, blank, newBlank))
+        if len(buffer) >= limit:
+            writeRun(directory, runs, buffer, size)
+            buffer = []
+    if buffer:
+        writeRun(directory, runs, buffer, size)
+    return runs
+
+
+def mergeRuns(directory, runs, size):
+    # Merge the runs MAXRUNS at a time until no more than MAXRUNS are left,
+    # which the last pass can read at once.
+    generation = 0
+    while len(runs) > MAXRUNS:
+        generation += 1
+        merged = []
+        for i in range(0, len(runs), MAXRUNS):
+            group = runs[i:i + MAXRUNS]
+            name = os.path.join(directory, "run-%d-%04d.bin" % (generation, len(merged)))
+            writeBoards(name, heapq.merge(*[readBoards(run, size) for run in group]), size)
+            for run in group:
+                os.remove(run)
+            merged.append(name)
+        runs = merged
+    return runs
+
+
+def nextLayer(puzzle, directory, depth, maxMemory):
+    # Write layer depth + 1 and return its number of boards.
+    size = recordSize(puzzle)
+    runs = mergeRuns(directory, writeRuns(puzzle, directory, depth, maxMemory), size)
+    boards = heapq.merge(*[readBoards(run, size) for run in runs])
+    if depth > 0:
+        boards = subtract(boards, readBoards(layerFile(directory, depth - 1), size))
+    count = writeBoards(layerFile(directory, depth + 1), boards, size)
+    for run in runs:
+        os.remove(run)
+    return count
+
+
+def loadProgress(directory):
+    fileName = os.path.join(directory, "progress.json")
+    if not os.path.exists(fileName):
+        return None
+    with open(fileName) as f:
+        return json.load(f)
+
+
+def saveProgress(directory, progress):
+    fileName = os.path.join(directory, "progress.json")
+    with open(fileName + ".tmp", "w") as f:
+        json.dump(progress, f)
+    os.replace(fileName + ".tmp", fileName)
+
+
+def externalBFS(puzzle, directory, maxMemory, maxDepth=None):
+    # Enumerate the layers of puzzle into directory, going on from where an
+    # earlier run stopped, and return the progress: the number of boards in
+    # every layer and whether the last one has been found.
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    progress = loadProgress(directory)
+    if progress is None:
+        writeBoards(layerFile(directory, 0), [puzzle.goalBoard], recordSize(puzzle))
+        progress = {"width": puzzle.width, "height": puzzle.height, "sizes": [1], "complete": False}
+        saveProgress(directory, progress)
+    elif (progress["width"], progress["height"]) != (puzzle.width, puzzle.height):
+        raise ValueError("%s holds the layers of a %dx%d board" % (directory, progress["width"], progress["height"]))
+    # runs and half-written files of a layer that was interrupted
+    for name in os.listdir(directory):
+        if name.startswith("run-") or name.endswith(".tmp"):
+            os.remove(os.path.join(directory, name))
+
+    while not progress["complete"] and (maxDepth is None or len(progress["sizes"]) - 1 < maxDepth):
+        depth = len(progress["sizes"]) - 1
+        count = nextLayer(puzzle, directory, depth, maxMemory)
+        if count:
+            progress["sizes"].append(count)
+            print("layer %d: %d boards" % (depth + 1, count), flush=True)
+        else:
+            os.remove(layerFile(directory, depth + 1))
+            progress["complete"] = True
+        saveProgress(directory, progress)
+    return progress
+
+
+def findDepth(puzzle, directory, sizes, board):
+    # Distance of a board to the goal, or None if it is in none of the layers.
+    size = recordSize(puzzle)
+    key = board.to_bytes(size, "big")
+    for depth, count in enumerate(sizes):
+        with open(layerFile(directory, depth), "rb") as f:
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                f.seek(middle * size)
+                record = f.read(size)
+                if record == key:
+                    return depth
+                if record < key:
+                    low = middle + 1
+                else:
+                    high = middle
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enumerate a slide puzzle breadth-first on disk.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="enumerate the layers, resuming an earlier run")
+    run.add_argument("directory")
+    run.add_argument("--width", type=int, default=3)
+    run.add_argument("--height", type=int, default=3)
+    run.add_argument("--max-memory", type=float, default=512, help="megabytes the runs may use")
+    run.add_argument("--max-depth", type=int)
+    lookup = commands.add_parser("lookup", help="print the distance of a board")
+    lookup.add_argument("directory")
+    lookup.add_argument("tiles", type=int, nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        progress = externalBFS(solver.getPuzzle(args.width, args.height), args.directory, int(args.max_memory * 2 ** 20), args.max_depth)
+        print("%d boards in %d layers%s" % (sum(progress["sizes"]), len(progress["sizes"]),
+                                            "" if progress["complete"] else ", not complete yet"))
+    else:
+        progress = loadProgress(args.directory)
+        if progress is None:
+            parser.error("%s has no layers yet" % args.directory)
+        puzzle = solver.getPuzzle(progress["width"], progress["height"])
+        try:
+            board = solver.parseBoard(puzzle, args.tiles).board
+        except ValueError as e:
+            parser.error(str(e))
+        depth = findDepth(puzzle, args.directory, progress["sizes"], board)
+        if depth is not None:
+            print(depth)
+        elif progress["complete"]:
+            print("unsolvable")
+        else:
+            print("deeper than %d" % (len(progress["sizes"]) - 1))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Boards whose optimal solution is exactly a given number of moves, made
+# without a window:
+#
+#   python generate.py LENGTH [--width W] [--height H] [--count N] [--seed N]
+#
+# One JSON object per board is written to stdout, {"board": [...], "width":
+# W, "length": LENGTH}, which batch.py reads as it is. On the 3x3 board with
+# the distance table built (python solver.py build-dist) every board at that
+# distance is equally likely and thousands are made per second. Other boards
+# come from random walks away from the goal whose end is solved with IDA*
+# and moved along the solution to the exact distance; they are not uniform,
+# and long lengths on large boards take as long as the searches do.
+import argparse, json, random, sys
+import solver
+
+MAXROUNDS = 100 # walks that may fall short of the length before giving up
+
+# Moves of the hardest boards by size, the shorter side first: found by
+# breadth-first search up to 2x5 and 3x3, published for 3x4 and 4x4.
+DEEPEST = {(2, 2): 6, (2, 3): 21, (2, 4): 36, (2, 5): 55, (3, 3): 31, (3, 4): 53, (4, 4): 80}
+LAYERS = {} # distance: ranks of the 3x3 boards at that distance, made on first use
+
+
+def layerRanks(puzzle, table, length):
+    # Ranks of all boards at distance length. The table keeps distances
+    # modulo 15, so the boards with the entry length % 15 are length, 15
+    # apart or 30 apart. A move always moves the blank, so the parity of a
+    # distance is that of the blank's distance to its goal cell, which
+    # leaves boards 30 apart: those at 0 or 1 and those at 30 or 31. Only
+    # the former have a Manhattan distance of at most 1.
+    if length not in LAYERS:
+        entry = length % 15
+        ranks = []
+        for index, byte in enumerate(table[:]):
+            if byte & 0xF == entry:
+                ranks.append(2 * index)
+            if byte >> 4 == entry:
+                ranks.append(2 * index + 1)
+        goalX, goalY = puzzle.goalBlank % puzzle.width, puzzle.goalBlank // puzzle.width
+        layer = []
+        for rank in ranks:
+            board = solver.unrankBoard(puzzle, rank)
+            blank = solver.boardTiles(puzzle, board).index(0)
+            if (abs(blank % puzzle.width - goalX) + abs(blank // puzzle.width - goalY)) % 2 != length % 2:
+                continue
+            if (solver.manhattan(puzzle, board) <= 1) != (length <= 1):
+                continue
+            layer.append(rank)
+        LAYERS[length] = layer
+    return LAYERS[length]
+
+
+def randomWalk(puzzle, board, blank, prevBlank, steps, rng):
+    # Make steps random moves that never undo the move before and return the
+    # board, its blank and the blank before the last move.
+    for i in range(steps):
+        newBlank = rng.choice([newBlank for move, newBlank in puzzle.neighbors[blank] if newBlank != prevBlank])
+        board, prevBlank, blank = solver.slideTile(puzzle, board, blank, newBlank), blank, newBlank
+    return board, blank, prevBlank
+
+
+def walkBoard(puzzle, length, rng):
+    # A walk of length moves ends at most length moves from the goal, often
+    # much closer. Walk on, twice as far as it fell short, until a walk ends
+    # at least length moves away; the board length moves before the goal on
+    # its optimal solution is then exactly length moves away.
+    board, blank, prevBlank = randomWalk(puzzle, puzzle.goalBoard, puzzle.goalBlank, None, length, rng)
+    for i in range(MAXROUNDS):
+        moves = solver.IDAStar(puzzle, solver.State(board, blank, None, None)).moves
+        if len(moves) >= length:
+            for move in moves[:len(moves) - length]:
+                newBlank = blank + puzzle.steps[move]
+                board, blank = solver.slideTile(puzzle, board, blank, newBlank), newBlank
+            return board
+        board, blank, prevBlank = randomWalk(puzzle, board, blank, prevBlank, 2 * (length - len(moves)), rng)
+    raise ValueError("found no %dx%d board %d moves from the goal" % (puzzle.width, puzzle.height, length))
+
+
+def deepest(puzzle):
+    # Moves of the puzzle's hardest boards, or None if not known.
+    return DEEPEST.get((min(puzzle.width, puzzle.height), max(puzzle.width, puzzle.height)))
+
+
+def generateBoard(puzzle, length, rng=random):
+    # The cells, in row-major order with 0 for the blank, of a random board
+    # whose optimal solution is length moves.
+    if length < 0:
+        raise ValueError("a board can't be %d moves from the goal" % length)
+    if deepest(puzzle) is not None and length > deepest(puzzle):
+        raise ValueError("no %dx%d board is %d moves from the goal" % (puzzle.width, puzzle.height, length))
+    table = solver.getDistanceTable(puzzle)
+    if table is None:
+        return solver.boardTiles(puzzle, walkBoard(puzzle, length, rng))
+    return solver.boardTiles(puzzle, solver.unrankBoard(puzzle, rng.choice(layerRanks(puzzle, table, length))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make slide puzzles of a given optimal length.")
+    parser.add_argument("length", type=int, help="moves of the optimal solution")
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--height", type=int, default=3)
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--seed", type=int, help="make the same boards on every run")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    try:
+        puzzle = solver.getPuzzle(args.width, args.height)
+        for i in range(args.count):
+            cells = generateBoard(puzzle, args.length, rng)
+            sys.stdout.write(json.dumps({"board": cells, "width": puzzle.width, "length": args.length}) + "\n")
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
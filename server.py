@@ -0,0 +1,283 @@
+# Local solve server that several front ends can share:
+#
+#   python server.py [--socket PATH | --port N] [--processes N] [--cache FILE]
+#                    [--cache-size N] [--max-seconds S] [--warm 3x3,4x4]
+#
+# Clients connect to the Unix socket PATH (tables/solver.sock unless given)
+# or to 127.0.0.1:N and send one JSON object per line. Every line gets one
+# JSON line back, in the order the answers are ready, with the "id" of its
+# request. A solve request is an object like the ones batch.py reads
+# ("board", "id", "solver", "width", "weight") plus an optional "deadline",
+# the seconds the client is willing to wait (--max-seconds if left out).
+# The answer has the "status", "length" and "moves" of the search, "cached"
+# if no search was needed and "seconds" from arrival to answer.
+# {"command": "stats"} is answered with the throughput and the latency
+# percentiles so far.
+#
+# Searches run on a pool of processes that keep their pattern databases and
+# distance table loaded from one request to the next. Requests that arrive
+# within BATCHWINDOW of each other are spread over the workers, and go to a
+# worker together only when there are more of them than workers, up to
+# BATCHSIZE at a time. A board that is already being solved by the same solver is not
+# solved again: later requests for it wait for the same search, whose budget
+# is the deadline of the request that started it, less a DEADLINEMARGIN to
+# get the answer back in time. Optimal solutions are kept
+# in a SolutionCache, which answers later requests for any board on their
+# paths without a search.
+import argparse, asyncio, collections, concurrent.futures, functools, json, os, signal, time
+import batch, solver
+
+SOCKETFILE = os.path.join(solver.TABLEDIR, "solver.sock")
+BATCHSIZE = 16 # requests sent to a worker in one batch
+BATCHWINDOW = 0.002 # seconds a request waits for others to batch with
+DEADLINEMARGIN = 0.1 # part of its deadline a search leaves for sending the answer back
+LATENCYWINDOW = 10000 # answers the latency percentiles are taken over
+
+
+def warmUp(sizes):
+    # Load the tables of the common board sizes once per worker process.
+    for width, height in sizes:
+        puzzle = solver.getPuzzle(width, height)
+        solver.getPatternDatabase(puzzle)
+        solver.getDistanceTable(puzzle)
+
+
+def solveJobs(jobs):
+    # Run in a worker process: solve a batch of (solver name, width, height,
+    # cells, weight, deadline) jobs one after the other. The deadlines are
+    # time.time() values, so they mean the same in every process.
+    results = []
+    for solverName, width, height, cells, weight, deadline in jobs:
+        puzzle = solver.getPuzzle(width, height)
+        search = solver.SOLVERS[solverName]
+        if solverName == "arastar":
+            search = functools.partial(search, weight=weight)
+        control = solver.SearchControl(maxSeconds=max(0.0, deadline - time.time()))
+        try:
+            result = search(puzzle, solver.parseBoard(puzzle, cells), control)
+        except ValueError as e:
+            results.append({"status": "error", "error": str(e)})
+            continue
+        results.append({"status": result.status, "moves": result.moves, "expanded": result.expanded,
+                        "suboptimality": result.suboptimality})
+    return results
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of sorted values.
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class SolveServer:
+    def __init__(self, pool, processes, cache, maxSeconds):
+        self.pool = pool
+        self.processes = processes
+        self.cache = cache
+        self.maxSeconds = maxSeconds
+        self.inFlight = {} # (solver name, width, height, board, weight): future of its answer
+        self.pending = [] # (key, job) not sent to a worker yet
+        self.flushHandle = None
+        self.startTime = time.monotonic()
+        self.latencies = collections.deque(maxlen=LATENCYWINDOW) # (time answered, seconds taken)
+        self.counts = collections.Counter()
+
+    async def handleClient(self, reader, writer):
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line:
+                task = asyncio.ensure_future(self.answer(line.decode(), writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        writer.close()
+
+    async def answer(self, line, writer):
+        startTime = time.monotonic()
+        response = await self.respond(line)
+        seconds = time.monotonic() - startTime
+        if response.get("status") != "stats":
+            response["seconds"] = round(seconds, 6)
+            self.latencies.append((time.monotonic(), seconds))
+            self.counts["answered"] += 1
+            if response["status"] == "error":
+                self.counts["errors"] += 1
+        writer.write((json.dumps(response) + "\n").encode())
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass # the client went away without waiting for its answers
+
+    async def respond(self, line):
+        response = {}
+        try:
+            message = json.loads(line) if line.startswith("{") else {}
+            if "id" in message:
+                response["id"] = message["id"] # so that errors can be matched to their request too
+            if message.get("command") == "stats":
+                return self.stats()
+            self.counts["requests"] += 1
+            if "command" in message:
+                raise ValueError("unknown command %r" % message["command"])
+            request, cells, puzzle = batch.parseLine(line)
+        except (ValueError, KeyError, TypeError) as e:
+            response.update(status="error", error=str(e))
+            return response
+        try:
+            solverName = request.get("solver", "idastar")
+            if solverName not in solver.SOLVERS:
+                raise ValueError("unknown solver %r" % solverName)
+            if solverName == "layerbfs" and not solver.layerBoardsFit(puzzle):
+                raise ValueError("the layerbfs solver needs NumPy and a board of at most 16 cells")
+            init_state = solver.parseBoard(puzzle, cells)
+            deadline = float(request.get("deadline", self.maxSeconds))
+            weight = float(request.get("weight", solver.ARAWEIGHT)) if solverName == "arastar" else None
+        except (ValueError, TypeError) as e:
+            response.update(status="error", error=str(e))
+            return response
+
+        moves = self.cache.solution(puzzle, init_state.board, init_state.blank)
+        if moves is not None:
+            self.counts["cacheHits"] += 1
+            response.update(status=solver.SOLVED, length=len(moves), moves=moves, cached=True)
+            return response
+        key = (solverName, puzzle.width, puzzle.height, init_state.board, weight)
+        future = self.inFlight.get(key)
+        if future is None:
+            future = self.submit(key, (solverName, puzzle.width, puzzle.height, cells, weight, time.time() + deadline * (1 - DEADLINEMARGIN)))
+        else:
+            self.counts["deduplicated"] += 1
+        try:
+            # shielded, so a client that gives up doesn't cancel the search for the others
+            result = await asyncio.wait_for(asyncio.shield(future), deadline)
+        except asyncio.TimeoutError:
+            response["status"] = solver.BUDGET_EXCEEDED
+            return response
+        response["status"] = result["status"]
+        if result.get("moves") is not None:
+            response.update(length=len(result["moves"]), moves=result["moves"])
+            if result["suboptimality"] != 1.0:
+                response["suboptimality"] = round(result["suboptimality"], 6)
+        if "error" in result:
+            response["error"] = result["error"]
+        return response
+
+    def submit(self, key, job):
+        future = asyncio.get_running_loop().create_future()
+        self.inFlight[key] = future
+        self.pending.append((key, job))
+        if len(self.pending) >= BATCHSIZE:
+            self.flush()
+        elif self.flushHandle is None:
+            self.flushHandle = asyncio.get_running_loop().call_later(BATCHWINDOW, self.flush)
+        return future
+
+    def flush(self):
+        if self.flushHandle is not None:
+            self.flushHandle.cancel()
+            self.flushHandle = None
+        pending, self.pending = self.pending, []
+        batches = min(self.processes, len(pending))
+        for i in range(batches):
+            entries = pending[i::batches]
+            self.counts["batches"] += 1
+            done = asyncio.get_running_loop().run_in_executor(self.pool, solveJobs, [job for key, job in entries])
+            done.add_done_callback(functools.partial(self.finish, entries))
+
+    def finish(self, entries, done):
+        try:
+            results = done.result()
+        except Exception as e:
+            # a worker died; nobody else will answer these requests
+            results = [{"status": "error", "error": "worker failed: %s" % e}] * len(entries)
+        for (key, job), result in zip(entries, results):
+            solverName, width, height, cells, weight, deadline = job
+            if result["status"] == solver.SOLVED and (solver.SOLVERS[solverName] in solver.OPTIMALSOLVERS or result["suboptimality"] == 1.0):
+                puzzle = solver.getPuzzle(width, height)
+                self.cache.store(puzzle, key[3], cells.index(0), result["moves"])
+            self.inFlight.pop(key).set_result(result)
+
+    def stats(self):
+        now = time.monotonic()
+        latencies = sorted(seconds for answered, seconds in self.latencies)
+        recent = [answered for answered, seconds in self.latencies if answered > now - 60]
+        stats = {
+            "status": "stats",
+            "uptime": round(now - self.startTime, 3),
+            "requests": self.counts["requests"],
+            "answered": self.counts["answered"],
+            "errors": self.counts["errors"],
+            "cacheHits": self.counts["cacheHits"],
+            "deduplicated": self.counts["deduplicated"],
+            "batches": self.counts["batches"],
+            "inFlight": len(self.inFlight),
+            "throughput": self.counts["answered"] / max(now - self.startTime, 1e-9), # answers per second
+            "recentThroughput": len(recent) / min(60.0, max(now - self.startTime, 1e-9)), # over the last minute
+        }
+        # in milliseconds, over the last LATENCYWINDOW answers
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            value = percentile(latencies, fraction)
+            stats[name] = None if value is None else round(1000 * value, 3)
+        stats["max"] = round(1000 * latencies[-1], 3) if latencies else None
+        return stats
+
+
+def parseSizes(text):
+    sizes = []
+    for size in text.split(","):
+        if size:
+            width, height = size.lower().split("x")
+            sizes.append((int(width), int(height)))
+    return sizes
+
+
+async def serve(args):
+    pool = concurrent.futures.ProcessPoolExecutor(args.processes, initializer=warmUp, initargs=(parseSizes(args.warm),))
+    cache = solver.SolutionCache(args.cache, args.cache_size)
+    server = SolveServer(pool, args.processes, cache, args.max_seconds)
+    if args.port is not None:
+        listener = await asyncio.start_server(server.handleClient, "127.0.0.1", args.port)
+        print("listening on 127.0.0.1:%d" % args.port, flush=True)
+    else:
+        if os.path.exists(args.socket):
+            os.remove(args.socket) # left behind by a server that was killed
+        listener = await asyncio.start_unix_server(server.handleClient, args.socket)
+        print("listening on %s" % args.socket, flush=True)
+    # stop on SIGTERM like on ^C, so the socket is removed
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        cache.close()
+        if args.port is None and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve slide puzzle solutions to local clients.")
+    parser.add_argument("--socket", default=SOCKETFILE, help="Unix socket to listen on")
+    parser.add_argument("--port", type=int, help="listen on this localhost TCP port instead")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--cache", help="SQLite file of solutions to reuse and extend, memory only if left out")
+    parser.add_argument("--cache-size", type=int, default=1 << 18, help="boards the cache keeps in memory")
+    parser.add_argument("--max-seconds", type=float, default=60.0, help="deadline of requests without one")
+    parser.add_argument("--warm", default="3x3,4x4", help="board sizes whose tables the workers load up front")
+    args = parser.parse_args(argv)
+    if args.port is None and not os.path.isdir(os.path.dirname(os.path.abspath(args.socket))):
+        os.makedirs(os.path.dirname(os.path.abspath(args.socket)))
+    try:
+        asyncio.run(serve(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1689 @@
+# Search code of the slide puzzle. Nothing in here needs pygame, so the
+# solvers can be imported by the game, the batch CLI and other tools alike.
+import array, collections, heapq, itertools, mmap, multiprocessing, os, queue, random, sqlite3, sys, time
+
+try:
+    import numpy # only needed by layerBFS
+except ImportError:
+    numpy = None
+
+BLANK = None
+
+UP = "up"
+DOWN = "down"
+LEFT = "left"
+RIGHT = "right"
+
+
+def getStartingBoard(width, height):
+    # Return a board data structure with tiles in the solved state.
+    # For example, getStartingBoard(3, 3) returns
+    # [[1, 4, 7], [2, 5, 8], [3, 6, BLANK]]
+    board = []
+    for x in range(width):
+        board.append([y * width + x + 1 for y in range(height)])
+    board[width-1][height-1] = BLANK
+    return board
+
+
+def makeNeighborTable(width, height):
+    # For every blank index, the moves that are possible from there together
+    # with the index the blank ends up at, in LEFT, RIGHT, UP, DOWN order.
+    table = []
+    for blank in range(width * height):
+        x, y = blank % width, blank // width
+        moves = []
+        if x < width - 1:
+            moves.append((LEFT, blank + 1))
+        if x > 0:
+            moves.append((RIGHT, blank - 1))
+        if y < height - 1:
+            moves.append((UP, blank + width))
+        if y > 0:
+            moves.append((DOWN, blank - width))
+        table.append(tuple(moves))
+    return tuple(table)
+
+
+# Solver boards are packed into one integer, tileBits bits per cell (enough
+# for the largest tile) in row-major order (cell index = y * width + x), with
+# the blank stored as 0. The pygame board (a list of columns) is only
+# converted at the edges.
+class Puzzle:
+    # The geometry of one board size and the tables the solvers look up
+    # instead of computing. Every size is built once, by getPuzzle().
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.numCells = width * height
+        self.tileBits = (self.numCells - 1).bit_length()
+        self.tileMask = (1 << self.tileBits) - 1
+        self.neighbors = makeNeighborTable(width, height)
+        self.steps = {LEFT: 1, RIGHT: -1, UP: width, DOWN: -width} # how far each move takes the blank
+        # goalCell[tile] is the cell index of tile in the solved board, where
+        # tile t sits at cell t - 1 and the blank at the last cell.
+        self.goalCell = [self.numCells - 1] + list(range(self.numCells - 1))
+        # distance[tile][cell] is the Manhattan distance of tile at cell to
+        # its goal cell. The blank's row is all zeros so that a heuristic can
+        # add up every cell without checking for it.
+        self.distance = [[0] * self.numCells]
+        for tile in range(1, self.numCells):
+            goalX, goalY = self.goalCell[tile] % width, self.goalCell[tile] // width
+            self.distance.append([abs(cell % width - goalX) + abs(cell // width - goalY) for cell in range(self.numCells)])
+        # The lines of the board are its rows (0 .. height - 1) followed by its
+        # columns. lineCells[line] lists the cells of a line in order and
+        # lineGoal[line][tile] is the position in the line where tile belongs,
+        # or -1 if its goal cell is in another line.
+        self.lineCells = [[y * width + x for x in range(width)] for y in range(height)]
+        self.lineCells += [[y * width + x for y in range(height)] for x in range(width)]
+        self.lineGoal = []
+        for y in range(height):
+            self.lineGoal.append([cell % width if tile and cell // width == y else -1 for tile, cell in enumerate(self.goalCell)])
+        for x in range(width):
+            self.lineGoal.append([cell // width if tile and cell % width == x else -1 for tile, cell in enumerate(self.goalCell)])
+        # conflictLine[blank][newBlank][tile] is the one line whose conflicts
+        # can change when tile slides from newBlank into the blank, or -1 if
+        # none can. A tile sliding along a row keeps its place among the
+        # tiles of the row and leaves one column for another (the other way
+        # around for a column), and of those two columns only the one it
+        # belongs in, if any, counts it.
+        self.conflictLine = []
+        for blank in range(self.numCells):
+            lines = {}
+            for move, newBlank in self.neighbors[blank]:
+                if move in (LEFT, RIGHT):
+                    changed = (height + blank % width, height + newBlank % width)
+                else:
+                    changed = (blank // width, newBlank // width)
+                lines[newBlank] = [-1] * self.numCells
+                for tile in range(1, self.numCells):
+                    for line in changed:
+                        if self.lineGoal[line][tile] >= 0:
+                            lines[newBlank][tile] = line
+            self.conflictLine.append(lines)
+        self.conflicts = {} # conflictPenalty() of every goal order seen so far
+        self.lineConflicts = [{} for line in self.lineCells] # lineConflict() of recently seen lines
+        # zobrist[cell][tile]: random 64-bit keys for hashing boards, the same
+        # in every process because the generator is seeded with the size.
+        rng = random.Random("zobrist %dx%d" % (width, height))
+        self.zobrist = [[rng.getrandbits(64) for tile in range(self.numCells)] for cell in range(self.numCells)]
+        self.goalBoard, self.goalBlank = packBoard(self, getStartingBoard(width, height))
+        self.patternDatabase = None
+        self.patternDatabaseLoaded = False
+
+
+PUZZLES = {}
+
+
+def getPuzzle(width, height):
+    # Return the Puzzle of a board size, building its tables the first time.
+    if width < 2 or height < 2:
+        raise ValueError("a board needs at least 2 rows and 2 columns, not %dx%d" % (width, height))
+    if (width, height) not in PUZZLES:
+        PUZZLES[(width, height)] = Puzzle(width, height)
+    return PUZZLES[(width, height)]
+
+
+def packBoard(puzzle, board):
+    # Return the packed integer and the blank index of a pygame board.
+    packed = 0
+    blank = None
+    for x in range(puzzle.width):
+        for y in range(puzzle.height):
+            index = y * puzzle.width + x
+            if board[x][y] == BLANK:
+                blank = index
+            else:
+                packed |= board[x][y] << (index * puzzle.tileBits)
+    return packed, blank
+
+
+def unpackBoard(puzzle, packed):
+    # Return the pygame board (a list of columns) of a packed board.
+    board = []
+    for x in range(puzzle.width):
+        column = []
+        for y in range(puzzle.height):
+            tile = (packed >> ((y * puzzle.width + x) * puzzle.tileBits)) & puzzle.tileMask
+            column.append(tile if tile else BLANK)
+        board.append(column)
+    return board
+
+
+def slideTile(puzzle, board, blank, newBlank):
+    # Slide the tile at newBlank into the blank and return the new packed board.
+    # This function does not check if the move is valid.
+    shift = newBlank * puzzle.tileBits
+    tile = (board >> shift) & puzzle.tileMask
+    return board - (tile << shift) + (tile << (blank * puzzle.tileBits))
+
+
+class State:
+    __slots__ = ("board", "blank", "parent_state", "move", "g", "f")
+
+    def __init__(self, board, blank, parent_state, move):
+        self.board = board
+        self.blank = blank
+        self.parent_state = parent_state
+        self.move = move
+        self.g = 0
+        self.f = 0
+
+
+def makeState(puzzle, board):
+    # Return the root State of a search from a pygame board.
+    packed, blank = packBoard(puzzle, board)
+    return State(packed, blank, None, None)
+
+
+def parseBoard(puzzle, cells):
+    # Return the root State of a search from a board given as its cells in
+    # row-major order, with 0 for the blank.
+    if sorted(cells) != list(range(puzzle.numCells)):
+        raise ValueError("a %dx%d board needs each of the numbers 0 to %d once" % (puzzle.width, puzzle.height, puzzle.numCells - 1))
+    packed = 0
+    for index, tile in enumerate(cells):
+        packed |= tile << (index * puzzle.tileBits)
+    return State(packed, cells.index(0), None, None)
+
+
+def boardTiles(puzzle, board):
+    # Return the tile in every cell of a packed board (0 for the blank).
+    return [(board >> (index * puzzle.tileBits)) & puzzle.tileMask for index in range(puzzle.numCells)]
+
+
+def manhattan(puzzle, board):
+    # Manhattan distance of every tile of a packed board to its goal cell.
+    distance = puzzle.distance
+    total = 0
+    for index, tile in enumerate(boardTiles(puzzle, board)):
+        total += distance[tile][index]
+    return total
+
+
+LINECACHESIZE = 1 << 16
+
+
+def conflictPenalty(puzzle, order):
+    # order holds the goal positions of the tiles of a line that belong in
+    # it, in the order they are found. Only the tiles of its longest
+    # increasing subsequence can stay in the line; each of the others has to
+    # step out of it and back in, two moves Manhattan distance doesn't count.
+    penalty = puzzle.conflicts.get(order)
+    if penalty is None:
+        longest = []
+        for i in range(len(order)):
+            longest.append(1 + max([longest[j] for j in range(i) if order[j] < order[i]], default=0))
+        penalty = 2 * (len(order) - max(longest, default=0))
+        puzzle.conflicts[order] = penalty
+    return penalty
+
+
+def lineConflict(puzzle, line, lineTiles):
+    # Linear conflict penalty of one line holding the tuple lineTiles, in
+    # order. Searches look the same lines up over and over, so the penalties
+    # are kept per line until there are LINECACHESIZE of them.
+    cache = puzzle.lineConflicts[line]
+    penalty = cache.get(lineTiles)
+    if penalty is None:
+        goal = puzzle.lineGoal[line]
+        penalty = conflictPenalty(puzzle, tuple([goal[tile] for tile in lineTiles if goal[tile] >= 0]))
+        if len(cache) >= LINECACHESIZE:
+            cache.clear()
+        cache[lineTiles] = penalty
+    return penalty
+
+
+def packedLine(puzzle, board, line):
+    # The tiles of one line of a packed board.
+    return tuple([(board >> (cell * puzzle.tileBits)) & puzzle.tileMask for cell in puzzle.lineCells[line]])
+
+
+def linearConflict(puzzle, board):
+    # Moves Manhattan distance misses because tiles that belong in the same
+    # row or column are in the wrong order there. Rows only add vertical
+    # moves and columns only horizontal ones, so both add to Manhattan
+    # distance and the sum stays admissible.
+    tiles = boardTiles(puzzle, board)
+    total = 0
+    for line, cells in enumerate(puzzle.lineCells):
+        total += lineConflict(puzzle, line, tuple([tiles[cell] for cell in cells]))
+    return total
+
+
+def heuristicDelta(puzzle, board, blank, child, newBlank):
+    # Change of Manhattan distance plus linear conflict from the packed board
+    # to child, where the tile at newBlank has slid into the blank. Only the
+    # moved tile and at most one line need to be looked at.
+    tile = (board >> (newBlank * puzzle.tileBits)) & puzzle.tileMask
+    delta = puzzle.distance[tile][blank] - puzzle.distance[tile][newBlank]
+    line = puzzle.conflictLine[blank][newBlank][tile]
+    if line >= 0:
+        delta += lineConflict(puzzle, line, packedLine(puzzle, child, line)) - lineConflict(puzzle, line, packedLine(puzzle, board, line))
+    return delta
+
+
+def boardWhere(puzzle, board):
+    # Return the cell index of every tile of a packed board, indexed by tile
+    # (where[0] is the blank).
+    where = [0] * puzzle.numCells
+    for index, tile in enumerate(boardTiles(puzzle, board)):
+        where[tile] = index
+    return where
+
+
+def h(puzzle, board):
+    # The additive pattern database when one has been built for this board
+    # size, Manhattan distance plus linear conflict otherwise.
+    pdb = getPatternDatabase(puzzle)
+    if pdb is not None:
+        return pdb.lookup(boardWhere(puzzle, board))
+    return manhattan(puzzle, board) + linearConflict(puzzle, board)
+
+
+def childHeuristic(puzzle, pdb, hValue, state, child):
+    # h of child, a successor of state whose h is hValue. Without a pattern
+    # database it is worked out from hValue instead of from scratch.
+    if pdb is not None:
+        return pdb.lookup(boardWhere(puzzle, child.board))
+    return hValue + heuristicDelta(puzzle, state.board, state.blank, child.board, child.blank)
+
+
+# Additive disjoint pattern databases. Each pattern is a group of tiles; its
+# table holds, for every placement of those tiles, the number of moves of
+# pattern tiles needed to bring them home. Because no move is counted in two
+# tables the values of all groups can be added. The tables are built once by
+# running "python solver.py build-pdb" and memory-mapped at runtime. Larger
+# boards have none: 6-tile groups on 5x5 take over a hundred million entries
+# each, and groups small enough to build add up to less than Manhattan
+# distance plus linear conflict.
+PATTERNS = {
+    (3, 3): ((1, 2, 3, 4), (5, 6, 7, 8)),
+    (4, 4): ((3, 6, 7, 10, 11, 15), (1, 2, 4, 5, 8, 9), (12, 13, 14)),
+}
+TABLEDIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables")
+
+
+def rankPattern(positions, numCells):
+    # Rank the cells of a group of tiles into 0 .. numCells! / (numCells - k)! - 1.
+    # Each digit is the index of the cell among the cells not taken by the
+    # tiles before it.
+    rank = 0
+    for i, position in enumerate(positions):
+        digit = position
+        for earlier in positions[:i]:
+            if earlier < position:
+                digit -= 1
+        rank = rank * (numCells - i) + digit
+    return rank
+
+
+def unrankPattern(rank, numTiles, numCells):
+    # The cells of a group of numTiles tiles from their rankPattern() rank.
+    digits = []
+    for i in range(numTiles - 1, -1, -1):
+        rank, digit = divmod(rank, numCells - i)
+        digits.append(digit)
+    positions = []
+    for digit in reversed(digits):
+        position = digit
+        for earlier in sorted(positions):
+            if earlier <= position:
+                position += 1
+        positions.append(position)
+    return tuple(positions)
+
+
+def patternTableSize(numTiles, numCells):
+    size = 1
+    for i in range(numTiles):
+        size *= numCells - i
+    return size
+
+
+def patternFileName(width, height, pattern):
+    return os.path.join(TABLEDIR, "pdb-%dx%d-%s.bin" % (width, height, "-".join(str(tile) for tile in pattern)))
+
+
+def buildPatternTable(width, height, pattern):
+    # Retrograde breadth-first search from the goal over (tile cells, blank
+    # region) pairs. Moving the blank onto a non-pattern cell is free and
+    # moving a pattern tile costs 1, so the blank's whole region of
+    # non-pattern cells is flooded at once and the placements one tile move
+    # out of it make the next cost layer. The pattern tiles can split the
+    # board into several regions; seen and queued keep a bit per blank cell
+    # of every placement, and the table keeps the cheapest cost over all of
+    # its regions. A layer holds rank * numCells + blank cell per entry.
+    numCells = width * height
+    neighbors = makeNeighborTable(width, height)
+    table = bytearray(b"\xff") * patternTableSize(len(pattern), numCells)
+    typeCode = "H" if numCells <= 16 else "L" if numCells <= 32 else "Q"
+    seen = array.array(typeCode, bytes(array.array(typeCode).itemsize * len(table)))
+    queued = array.array(typeCode, bytes(seen.itemsize * len(table)))
+    layer = array.array("Q", [rankPattern([tile - 1 for tile in pattern], numCells) * numCells + numCells - 1])
+    cost = 0
+    while layer:
+        nextLayer = array.array("Q")
+        for entry in layer:
+            rank, blank = divmod(entry, numCells)
+            if seen[rank] >> blank & 1:
+                continue
+            positions = unrankPattern(rank, len(pattern), numCells)
+            if table[rank] > cost:
+                table[rank] = cost
+            region = [blank]
+            regionMask = 1 << blank
+            for cell in region: # grows while the region is flooded
+                for move, newBlank in neighbors[cell]:
+                    if regionMask >> newBlank & 1:
+                        continue
+                    if newBlank in positions:
+                        moved = list(positions)
+                        moved[positions.index(newBlank)] = cell
+                        movedRank = rankPattern(moved, numCells)
+                        if not (seen[movedRank] | queued[movedRank]) >> newBlank & 1:
+                            queued[movedRank] |= 1 << newBlank
+                            nextLayer.append(movedRank * numCells + newBlank)
+                    else:
+                        regionMask |= 1 << newBlank
+                        region.append(newBlank)
+            seen[rank] |= regionMask
+        layer = nextLayer
+        cost += 1
+    return table
+
+
+def buildPatternDatabases(width, height):
+    if (width, height) not in PATTERNS:
+        print("No pattern databases are defined for %dx%d boards." % (width, height))
+        return
+    if not os.path.isdir(TABLEDIR):
+        os.makedirs(TABLEDIR)
+    for pattern in PATTERNS[(width, height)]:
+        print("Building pattern %s for %dx%d..." % (pattern, width, height))
+        table = buildPatternTable(width, height, pattern)
+        with open(patternFileName(width, height, pattern), "wb") as f:
+            f.write(table)
+
+
+class PatternDatabase:
+    def __init__(self, width, height, patterns, tables):
+        self.numCells = width * height
+        self.patterns = patterns
+        self.tables = tables
+        # A square board reflected about its main diagonal keeps the same
+        # goal, so looking the reflected board up in the same tables gives a
+        # second admissible estimate.
+        self.reflectCell = None
+        if width == height:
+            self.reflectCell = [(index % width) * width + index // width for index in range(self.numCells)]
+
+    def sum(self, where):
+        total = 0
+        for pattern, table in zip(self.patterns, self.tables):
+            total += table[rankPattern([where[tile] for tile in pattern], self.numCells)]
+        return total
+
+    def lookup(self, where):
+        # where[tile] is the cell index of each tile.
+        value = self.sum(where)
+        if self.reflectCell is not None:
+            reflected = [0] * self.numCells
+            for tile in range(self.numCells):
+                # tile t sits at cell t - 1 in the goal, so it reflects to the
+                # tile whose goal cell is the reflection of that cell.
+                reflectedTile = self.reflectCell[tile - 1] + 1 if tile else 0
+                reflected[reflectedTile] = self.reflectCell[where[tile]]
+            value = max(value, self.sum(reflected))
+        return value
+
+
+def loadPatternDatabase(width, height):
+    # Memory-map the tables of this board size, or return None if they have
+    # not been built.
+    patterns = PATTERNS.get((width, height))
+    if patterns is None:
+        return None
+    tables = []
+    for pattern in patterns:
+        fileName = patternFileName(width, height, pattern)
+        if not os.path.exists(fileName):
+            return None
+        with open(fileName, "rb") as f:
+            tables.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return PatternDatabase(width, height, patterns, tables)
+
+
+def getPatternDatabase(puzzle):
+    # The pattern database of a board size is loaded the first time it is
+    # asked for and kept on its Puzzle.
+    if not puzzle.patternDatabaseLoaded:
+        puzzle.patternDatabase = loadPatternDatabase(puzzle.width, puzzle.height)
+        puzzle.patternDatabaseLoaded = True
+    return puzzle.patternDatabase
+
+
+def isSolvable(puzzle, board, blank):
+    # A move never changes the parity of the number of inversions among the
+    # tiles plus, on even-width boards, the row distance of the blank from
+    # the bottom row where the goal keeps it.
+    tiles = boardTiles(puzzle, board)
+    del tiles[blank]
+    inversions = 0
+    for i in range(len(tiles)):
+        for j in range(i + 1, len(tiles)):
+            if tiles[j] < tiles[i]:
+                inversions += 1
+    if puzzle.width % 2 == 1:
+        return inversions % 2 == 0
+    return (inversions + puzzle.height - 1 - blank // puzzle.width) % 2 == 0
+
+
+# How a search ended.
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+BUDGET_EXCEEDED = "budget exceeded"
+CANCELLED = "cancelled"
+FAILED = "failed" # a worker process of the search died
+
+STATUSMESSAGES = {
+    UNSOLVABLE: "Can't solve!",
+    BUDGET_EXCEEDED: "Gave up, the search is too large.",
+    CANCELLED: "Cancelled.",
+    FAILED: "Failed, a worker process died.",
+}
+
+POLLINTERVAL = 1024 # expansions between two SearchControl.poll() calls
+
+
+class SearchResult:
+    def __init__(self, status, moves=None, expanded=0, duplicates=0, generated=0, suboptimality=1.0):
+        self.status = status
+        self.moves = moves # list of moves when status is SOLVED
+        self.suboptimality = suboptimality # moves are at most this many times longer than optimal
+        self.expanded = expanded
+        self.duplicates = duplicates
+        self.generated = generated
+
+
+# Phases of an expansion timed by SearchStats.
+SUCCESSOR = "successor"
+HEURISTIC = "heuristic"
+BOOKKEEPING = "bookkeeping"
+
+
+class SearchStats:
+    # Observer a solver reports to while it runs, passed as its stats
+    # argument; without one the solvers skip all of this. Besides the totals
+    # it keeps the number of expansions per depth and the largest frontier
+    # seen (the current path for IDA*). With timing=True every
+    # sampleInterval-th expansion of A*, ARA*, IDA* and both BFS is timed
+    # phase by phase and scaled up by sampleInterval to estimate the whole
+    # search.
+    def __init__(self, timing=False, sampleInterval=64):
+        self.timing = timing
+        self.sampleInterval = sampleInterval
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.frontierPeak = 0
+        self.depths = collections.Counter()
+        self.phaseSeconds = {SUCCESSOR: 0.0, HEURISTIC: 0.0, BOOKKEEPING: 0.0}
+        self.startTime = time.perf_counter()
+        self.seconds = None
+
+    def expand(self, depth, frontier, generated, duplicates):
+        # Called for every expansion with the solver's generated and
+        # duplicates counts so far. Returns True if its phases should be timed.
+        self.expanded += 1
+        self.generated = generated
+        self.duplicates = duplicates
+        self.depths[depth] += 1
+        if frontier > self.frontierPeak:
+            self.frontierPeak = frontier
+        return self.timing and self.expanded % self.sampleInterval == 0
+
+    def addTime(self, phase, seconds):
+        self.phaseSeconds[phase] += seconds * self.sampleInterval
+
+    def expandLayer(self, depth, count, generated, duplicates):
+        # Called by layerBFS for a whole layer of expansions at once. Returns
+        # True if its phases should be timed, which is all of them.
+        self.expanded += count
+        self.generated = generated
+        self.duplicates = duplicates
+        self.depths[depth] += count
+        if count > self.frontierPeak:
+            self.frontierPeak = count
+        return self.timing
+
+    def addLayerTime(self, phase, seconds):
+        self.phaseSeconds[phase] += seconds
+
+    def merge(self, other):
+        # Add the expansions counted by another SearchStats, such as the one
+        # of a worker process.
+        self.expanded += other.expanded
+        self.generated += other.generated
+        self.duplicates += other.duplicates
+        self.depths.update(other.depths)
+        self.frontierPeak = max(self.frontierPeak, other.frontierPeak)
+        for phase, seconds in other.phaseSeconds.items():
+            self.phaseSeconds[phase] += seconds
+
+    def finish(self, result):
+        self.generated = result.generated
+        self.duplicates = result.duplicates
+        self.seconds = time.perf_counter() - self.startTime
+
+    def asDict(self):
+        stats = {
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "frontierPeak": self.frontierPeak,
+            "depths": {str(depth): count for depth, count in sorted(self.depths.items())},
+            "seconds": self.seconds,
+        }
+        if self.timing:
+            stats["phaseSeconds"] = dict(self.phaseSeconds)
+        return stats
+
+    def lines(self):
+        # Short human readable summary, one line per entry.
+        lines = [
+            "expanded %d, generated %d, duplicates %d" % (self.expanded, self.generated, self.duplicates),
+            "frontier peak %d, deepest expansion %d" % (self.frontierPeak, max(self.depths) if self.depths else 0),
+        ]
+        if self.timing and any(self.phaseSeconds.values()): # not all solvers time their phases
+            lines.append(", ".join("%s %.3fs" % (phase, seconds) for phase, seconds in self.phaseSeconds.items()))
+        return lines
+
+
+def endSearch(stats, result):
+    if stats is not None:
+        stats.finish(result)
+    return result
+
+
+def currentMemory():
+    # Resident set size of this process in bytes, or None if it can't be
+    # found out (on Windows). Without /proc, as on macOS, this is the peak
+    # size so far, which is at least the current one.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # kilobytes everywhere else
+
+
+class SearchControl:
+    # Node, time and memory budgets of one search plus a cancellation flag.
+    # Solvers call poll() every POLLINTERVAL expansions and as soon as
+    # expanded reaches nodeLimit (layerBFS and parallelAStar once per layer
+    # and per probe), and stop with the returned status unless it is None.
+    # cancel() may be called from another thread, which can also read the
+    # progress in expanded and bound (the current f-bound, for the searches
+    # that have one).
+    def __init__(self, maxNodes=None, maxSeconds=None, maxMemory=None):
+        self.maxNodes = maxNodes
+        self.nodeLimit = maxNodes if maxNodes is not None else sys.maxsize
+        self.maxSeconds = maxSeconds
+        self.maxMemory = maxMemory
+        self.startTime = time.monotonic()
+        self.cancelled = False
+        self.expanded = 0
+        self.bound = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def poll(self, expanded, bound=None):
+        self.expanded = expanded
+        self.bound = bound
+        if self.cancelled:
+            return CANCELLED
+        if self.maxNodes is not None and expanded >= self.maxNodes:
+            return BUDGET_EXCEEDED
+        if self.maxSeconds is not None and time.monotonic() - self.startTime > self.maxSeconds:
+            return BUDGET_EXCEEDED
+        if self.maxMemory is not None:
+            memory = currentMemory()
+            if memory is not None and memory > self.maxMemory: # no budget where the size is unknown
+                return BUDGET_EXCEEDED
+        return None
+
+
+def getSolution(solution_state):
+    # Return the moves leading from the root of the search to solution_state.
+    solution = []
+    while solution_state.parent_state is not None:
+        solution.append(solution_state.move)
+        solution_state = solution_state.parent_state
+    solution.reverse()
+    return solution
+
+
+def successor(puzzle, init_state):
+    result = []
+    g = init_state.g + 1
+    for move, newBlank in puzzle.neighbors[init_state.blank]:
+        board = slideTile(puzzle, init_state.board, init_state.blank, newBlank)
+        child = State(board, newBlank, init_state, move)
+        child.g = g
+        result.append(child)
+    return result
+
+
+def BFS(puzzle, init_state, control=None, stats=None):
+    # Breadth-first search from init_state. duplicates counts the generated
+    # successors dropped because their board had already been seen.
+    if not isSolvable(puzzle, init_state.board, init_state.blank):
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    frontier = collections.deque([init_state])
+    visited = {init_state.board}
+    expanded = 0
+    generated = 0
+    duplicates = 0
+    while frontier:
+        current_state = frontier.popleft()
+
+        if current_state.board == puzzle.goalBoard:
+            return endSearch(stats, SearchResult(SOLVED, getSolution(current_state), expanded, duplicates, generated))
+
+        expanded += 1
+        if control is not None and (expanded % POLLINTERVAL == 0 or expanded >= control.nodeLimit):
+            status = control.poll(expanded)
+            if status is not None:
+                return endSearch(stats, SearchResult(status, None, expanded, duplicates, generated))
+        sample = stats is not None and stats.expand(current_state.g, len(frontier), generated, duplicates)
+        if sample:
+            startTime = time.perf_counter()
+        children = successor(puzzle, current_state)
+        if sample:
+            successorTime = time.perf_counter()
+            stats.addTime(SUCCESSOR, successorTime - startTime)
+        generated += len(children)
+        for child in children:
+            if child.board in visited:
+                duplicates += 1
+                continue
+            visited.add(child.board)
+            frontier.append(child)
+        if sample:
+            stats.addTime(BOOKKEEPING, time.perf_counter() - successorTime)
+
+    return endSearch(stats, SearchResult(UNSOLVABLE, None, expanded, duplicates, generated))
+
+
+# Level-synchronous breadth-first search on NumPy arrays of packed boards,
+# which must fit in 64 bits (up to 16 cells). A layer is a list with one
+# sorted array per blank cell, so the children of a whole array are made
+# with a few shifts and masks per move, and the children from every array
+# that moved the blank to the same cell are merged, sorted and deduplicated
+# together. A move always takes the blank to a cell of the other colour of
+# a checkerboard, so a child is either new or in the layer before its
+# parent's, and only that one layer is searched for it. No moves or parents
+# are stored: the path is found afterwards by looking for a parent of each
+# board in the layer before it.
+def layerBoardsFit(puzzle):
+    return numpy is not None and puzzle.numCells * puzzle.tileBits <= 64
+
+
+def expandLayer(puzzle, layer):
+    # Return the children of a layer as a list of unsorted arrays per blank cell.
+    children = [[] for cell in range(puzzle.numCells)]
+    mask = numpy.uint64(puzzle.tileMask)
+    for blank, boards in enumerate(layer):
+        if not len(boards):
+            continue
+        blankShift = numpy.uint64(blank * puzzle.tileBits)
+        for move, newBlank in puzzle.neighbors[blank]:
+            shift = numpy.uint64(newBlank * puzzle.tileBits)
+            tiles = (boards >> shift) & mask
+            children[newBlank].append(boards - (tiles << shift) + (tiles << blankShift))
+    return children
+
+
+def mergeLayer(previous, children):
+    # Sort the children of every blank cell, drop repeats and the boards of
+    # the previous layer, and return what is left as the next layer.
+    layer = []
+    for blank, arrays in enumerate(children):
+        if not arrays:
+            layer.append(numpy.zeros(0, numpy.uint64))
+            continue
+        boards = numpy.sort(numpy.concatenate(arrays))
+        keep = numpy.empty(len(boards), bool)
+        keep[0] = True
+        numpy.not_equal(boards[1:], boards[:-1], out=keep[1:])
+        seen = previous[blank]
+        if len(seen):
+            index = numpy.searchsorted(seen, boards)
+            index[index == len(seen)] = 0
+            keep &= seen[index] != boards
+        layer.append(boards[keep])
+    return layer
+
+
+def inLayer(layer, board, blank):
+    boards = layer[blank]
+    index = numpy.searchsorted(boards, numpy.uint64(board))
+    return index < len(boards) and boards[index] == board
+
+
+def layerSolution(puzzle, layers, board, blank):
+    # Walk back from board, found in the last of layers, to the root through
+    # any neighbour that is in the layer before.
+    solution = []
+    for layer in reversed(layers[:-1]):
+        for move, newBlank in puzzle.neighbors[blank]:
+            parent = slideTile(puzzle, board, blank, newBlank)
+            if inLayer(layer, parent, newBlank):
+                break
+        solution.append(OPPOSITE[move])
+        board, blank = parent, newBlank
+    solution.reverse()
+    return solution
+
+
+def layerBFS(puzzle, init_state, control=None, stats=None):
+    # Breadth-first search from init_state one whole layer at a time. Every
+    # layer is kept, for rebuilding the path, at 8 bytes a board.
+    if not layerBoardsFit(puzzle):
+        raise ValueError("layerBFS needs NumPy and a board of at most 64 bits")
+    if not isSolvable(puzzle, init_state.board, init_state.blank):
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    layer = [numpy.zeros(0, numpy.uint64) for cell in range(puzzle.numCells)]
+    layer[init_state.blank] = numpy.array([init_state.board], numpy.uint64)
+    previous = [numpy.zeros(0, numpy.uint64)] * puzzle.numCells
+    layers = []
+    expanded = 0
+    generated = 0
+    duplicates = 0
+    while True:
+        layers.append(layer)
+        if inLayer(layer, puzzle.goalBoard, puzzle.goalBlank):
+            solution = layerSolution(puzzle, layers, puzzle.goalBoard, puzzle.goalBlank)
+            return endSearch(stats, SearchResult(SOLVED, solution, expanded, duplicates, generated))
+        size = sum(len(boards) for boards in layer)
+        if not size:
+            break
+
+        if control is not None:
+            status = control.poll(expanded)
+            if status is not None:
+                return endSearch(stats, SearchResult(status, None, expanded, duplicates, generated))
+        timed = stats is not None and stats.expandLayer(len(layers) - 1, size, generated, duplicates)
+        startTime = time.perf_counter()
+        children = expandLayer(puzzle, layer)
+        successorTime = time.perf_counter()
+        nextLayer = mergeLayer(previous, children)
+        if timed:
+            stats.addLayerTime(SUCCESSOR, successorTime - startTime)
+            stats.addLayerTime(BOOKKEEPING, time.perf_counter() - successorTime)
+        made = sum(len(boards) for arrays in children for boards in arrays)
+        expanded += size
+        generated += made
+        duplicates += made - sum(len(boards) for boards in nextLayer)
+        previous, layer = layer, nextLayer
+
+    return endSearch(stats, SearchResult(UNSOLVABLE, None, expanded, duplicates, generated))
+
+
+# Perfect distance table for the 3x3 puzzle. Every board is ranked by the
+# Lehmer code of its cells (0 .. 9! - 1) and the table stores its distance to
+# the goal modulo 15 in 4 bits, two boards per byte (181,440 bytes). 0xF
+# marks boards that cannot reach the goal. A move always changes the
+# distance by exactly one, so the neighbour one step closer is the one whose
+# entry is one less modulo 15, and solving is a walk downhill.
+DISTFILE = os.path.join(TABLEDIR, "dist-3x3.bin")
+UNREACHABLE = 0xF
+FACTORIALS = [1, 1, 2, 6, 24, 120, 720, 5040, 40320]
+
+
+def rankBoard(puzzle, board):
+    # Lehmer rank of the cells of a packed 3x3 board.
+    cells = boardTiles(puzzle, board)
+    rank = 0
+    for i in range(9):
+        smaller = 0
+        for j in range(i + 1, 9):
+            if cells[j] < cells[i]:
+                smaller += 1
+        rank += smaller * FACTORIALS[8 - i]
+    return rank
+
+
+def unrankBoard(puzzle, rank):
+    # The packed 3x3 board of a Lehmer rank, the inverse of rankBoard.
+    tiles = list(range(9))
+    board = 0
+    for i in range(9):
+        index, rank = divmod(rank, FACTORIALS[8 - i])
+        board |= tiles.pop(index) << (i * puzzle.tileBits)
+    return board
+
+
+def buildDistanceTable():
+    # One backward breadth-first search from the goal over all 181,440
+    # reachable boards.
+    puzzle = getPuzzle(3, 3)
+    table = bytearray([UNREACHABLE << 4 | UNREACHABLE]) * (FACTORIALS[8] * 9 // 2)
+    seen = {puzzle.goalBoard}
+    layer = [(puzzle.goalBoard, puzzle.goalBlank)]
+    distance = 0
+    while layer:
+        nextLayer = []
+        for board, blank in layer:
+            rank = rankBoard(puzzle, board)
+            shift = 4 * (rank & 1)
+            table[rank >> 1] = table[rank >> 1] & ~(0xF << shift) | (distance % 15) << shift
+            for move, newBlank in puzzle.neighbors[blank]:
+                child = slideTile(puzzle, board, blank, newBlank)
+                if child not in seen:
+                    seen.add(child)
+                    nextLayer.append((child, newBlank))
+        layer = nextLayer
+        distance += 1
+    if not os.path.isdir(TABLEDIR):
+        os.makedirs(TABLEDIR)
+    with open(DISTFILE, "wb") as f:
+        f.write(table)
+    print("Wrote %d boards up to %d moves to %s" % (len(seen), distance - 1, DISTFILE))
+
+
+DISTTABLE = None
+DISTTABLE_LOADED = False
+
+
+def getDistanceTable(puzzle):
+    # Memory-map the distance table, or return None if it has not been built
+    # or the board is not 3x3.
+    global DISTTABLE, DISTTABLE_LOADED
+    if (puzzle.width, puzzle.height) != (3, 3):
+        return None
+    if not DISTTABLE_LOADED:
+        DISTTABLE_LOADED = True
+        if os.path.exists(DISTFILE):
+            with open(DISTFILE, "rb") as f:
+                DISTTABLE = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return DISTTABLE
+
+
+def tableEntry(puzzle, table, board):
+    rank = rankBoard(puzzle, board)
+    return (table[rank >> 1] >> (4 * (rank & 1))) & 0xF
+
+
+def tableSolve(puzzle, init_state, control=None, stats=None):
+    # Optimal solution of a 3x3 board read off the distance table without any
+    # search. The walk is at most 31 moves, so control is not polled.
+    table = getDistanceTable(puzzle)
+    if table is None:
+        raise ValueError("the distance table only covers 3x3 boards and is built with build-dist")
+    board, blank = init_state.board, init_state.blank
+    entry = tableEntry(puzzle, table, board)
+    if entry == UNREACHABLE:
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    solution = []
+    generated = 0
+    while board != puzzle.goalBoard:
+        if stats is not None:
+            stats.expand(len(solution), 1, generated, 0)
+        closer = (entry - 1) % 15
+        for move, newBlank in puzzle.neighbors[blank]:
+            child = slideTile(puzzle, board, blank, newBlank)
+            generated += 1
+            if tableEntry(puzzle, table, child) == closer:
+                break
+        solution.append(move)
+        board, blank, entry = child, newBlank, closer
+    return endSearch(stats, SearchResult(SOLVED, solution, len(solution), 0, generated))
+
+
+def tableDistance(puzzle, board):
+    # Exact distance of a packed 3x3 board to the goal, or None if it can't
+    # be solved. Handy as a perfect heuristic when testing the other solvers.
+    result = tableSolve(puzzle, State(board, boardWhere(puzzle, board)[0], None, None))
+    return None if result.status != SOLVED else len(result.moves)
+
+
+OPPOSITE = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+
+def bidirectionalBFS(puzzle, init_state, control=None, stats=None):
+    # Breadth-first search from the start and from the goal at the same time,
+    # always expanding a whole layer of the smaller frontier. Each side maps
+    # the boards it has reached to (parent board, move, depth); once a layer
+    # reaches boards the other side has seen, the shortest meeting is spliced
+    # into one move list.
+    if not isSolvable(puzzle, init_state.board, init_state.blank):
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    if init_state.board == puzzle.goalBoard:
+        return endSearch(stats, SearchResult(SOLVED, []))
+    forward = {init_state.board: (None, None, 0)}
+    backward = {puzzle.goalBoard: (None, None, 0)}
+    forwardFrontier = [(init_state.board, init_state.blank)]
+    backwardFrontier = [(puzzle.goalBoard, puzzle.goalBlank)]
+    expanded = 0
+    generated = 0
+    duplicates = 0
+    while forwardFrontier and backwardFrontier:
+        if len(forwardFrontier) <= len(backwardFrontier):
+            frontier, visited, other = forwardFrontier, forward, backward
+        else:
+            frontier, visited, other = backwardFrontier, backward, forward
+
+        nextFrontier = []
+        meeting = None
+        for board, blank in frontier:
+            expanded += 1
+            if control is not None and (expanded % POLLINTERVAL == 0 or expanded >= control.nodeLimit):
+                status = control.poll(expanded)
+                if status is not None:
+                    return endSearch(stats, SearchResult(status, None, expanded, duplicates, generated))
+            depth = visited[board][2] + 1
+            sample = stats is not None and stats.expand(depth - 1, len(frontier) + len(nextFrontier), generated, duplicates)
+            if sample:
+                startTime = time.perf_counter()
+                successorTime = 0.0
+            for move, newBlank in puzzle.neighbors[blank]:
+                if sample:
+                    successorStart = time.perf_counter()
+                child = slideTile(puzzle, board, blank, newBlank)
+                if sample:
+                    successorTime += time.perf_counter() - successorStart
+                generated += 1
+                if child in visited:
+                    duplicates += 1
+                    continue
+                visited[child] = (board, move, depth)
+                nextFrontier.append((child, newBlank))
+                if child in other and (meeting is None or depth + other[child][2] < meeting[1]):
+                    meeting = (child, depth + other[child][2])
+            if sample:
+                stats.addTime(SUCCESSOR, successorTime)
+                stats.addTime(BOOKKEEPING, time.perf_counter() - startTime - successorTime)
+
+        if meeting is not None:
+            solution = []
+            board = meeting[0]
+            while forward[board][0] is not None:
+                solution.append(forward[board][1])
+                board = forward[board][0]
+            solution.reverse()
+            board = meeting[0]
+            while backward[board][0] is not None:
+                solution.append(OPPOSITE[backward[board][1]])
+                board = backward[board][0]
+            return endSearch(stats, SearchResult(SOLVED, solution, expanded, duplicates, generated))
+
+        if frontier is forwardFrontier:
+            forwardFrontier = nextFrontier
+        else:
+            backwardFrontier = nextFrontier
+
+    return endSearch(stats, SearchResult(UNSOLVABLE, None, expanded, duplicates, generated))
+
+
+def AStar(puzzle, init_state, control=None, stats=None, cache=None):
+    # A* with a binary heap as the open list, ordered on f and then on h so
+    # that ties go to the deeper state. bestG maps every generated board to
+    # the cheapest g found so far; heap entries superseded by a cheaper path
+    # are left in place and skipped when they are popped. Boards whose
+    # distance is in the memory of cache, a SolutionCache, get it as their
+    # exact h, and the search ends as soon as one of them is popped.
+    if not isSolvable(puzzle, init_state.board, init_state.blank):
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    init_state.g = 0
+    init_state.f = h(puzzle, init_state.board)
+    if cache is not None and cache.peek(puzzle, init_state.board) is not None:
+        init_state.f = cache.peek(puzzle, init_state.board)
+    pdb = getPatternDatabase(puzzle)
+    bestG = {init_state.board: 0}
+    tie = itertools.count()
+    Q = [(init_state.f, init_state.f, next(tie), init_state)]
+    expanded = 0
+    generated = 0
+    duplicates = 0
+    while Q:
+        current_state = heapq.heappop(Q)[3]
+        if current_state.g > bestG[current_state.board]:
+            continue # stale entry
+
+        if current_state.board == puzzle.goalBoard:
+            return endSearch(stats, SearchResult(SOLVED, getSolution(current_state), expanded, duplicates, generated))
+        parentH = current_state.f - current_state.g
+        if cache is not None and cache.peek(puzzle, current_state.board) is not None:
+            rest = cache.solution(puzzle, current_state.board, current_state.blank)
+            if rest is not None:
+                return endSearch(stats, SearchResult(SOLVED, getSolution(current_state) + rest, expanded, duplicates, generated))
+            parentH = h(puzzle, current_state.board) # f held the cached distance, not h
+
+        expanded += 1
+        if control is not None and (expanded % POLLINTERVAL == 0 or expanded >= control.nodeLimit):
+            status = control.poll(expanded, current_state.f)
+            if status is not None:
+                return endSearch(stats, SearchResult(status, None, expanded, duplicates, generated))
+        sample = stats is not None and stats.expand(current_state.g, len(Q), generated, duplicates)
+        if sample:
+            startTime = time.perf_counter()
+            heuristicTime = 0.0
+        children = successor(puzzle, current_state)
+        if sample:
+            successorTime = time.perf_counter()
+            stats.addTime(SUCCESSOR, successorTime - startTime)
+        generated += len(children)
+        g = current_state.g + 1
+        for child in children:
+            if g >= bestG.get(child.board, g + 1):
+                duplicates += 1
+                continue
+            bestG[child.board] = g
+            if sample:
+                heuristicStart = time.perf_counter()
+                hValue = childHeuristic(puzzle, pdb, parentH, current_state, child)
+                heuristicTime += time.perf_counter() - heuristicStart
+            else:
+                hValue = childHeuristic(puzzle, pdb, parentH, current_state, child)
+            if cache is not None:
+                known = cache.peek(puzzle, child.board)
+                if known is not None:
+                    hValue = known
+            child.f = g + hValue
+            heapq.heappush(Q, (child.f, hValue, next(tie), child))
+        if sample:
+            stats.addTime(HEURISTIC, heuristicTime)
+            stats.addTime(BOOKKEEPING, time.perf_counter() - successorTime - heuristicTime)
+    return endSearch(stats, SearchResult(UNSOLVABLE, None, expanded, duplicates, generated))
+
+
+# Weights ARAStar starts with and subtracts after every solution.
+ARAWEIGHT = 3.0
+ARAWEIGHTSTEP = 0.5
+
+
+def ARAStar(puzzle, init_state, control=None, stats=None, weight=ARAWEIGHT, weightStep=ARAWEIGHTSTEP, onSolution=None):
+    # Anytime repairing A* (Likhachev, Gordon and Thrun). A search ordered on
+    # g + weight * h finds a solution at most weight times longer than
+    # optimal, usually after far fewer expansions than A*. Then weight is
+    # lowered by weightStep and the search goes on from the same open list
+    # instead of starting over: boards whose g improved after they had been
+    # expanded in this round wait in incons and join the open list for the
+    # next one. Every solution shorter than the one before, and every proof
+    # that the current one is within a smaller factor of optimal, is passed
+    # to onSolution(moves, suboptimality) at once. The search ends when the
+    # solution is proved optimal. When control stops the search the best solution
+    # found so far is returned as SOLVED with its factor in suboptimality.
+    if not isSolvable(puzzle, init_state.board, init_state.blank):
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    init_state.g = 0
+    pdb = getPatternDatabase(puzzle)
+    heuristic = {init_state.board: h(puzzle, init_state.board)}
+    best = {init_state.board: init_state} # cheapest State found for every board
+    closed = set()
+    incons = {}
+    tie = itertools.count()
+    weight = max(1.0, weight)
+    Q = [(weight * heuristic[init_state.board], heuristic[init_state.board], next(tie), init_state)]
+    expanded = 0
+    generated = 0
+    duplicates = 0
+    moves = None
+    suboptimality = 1.0
+    while True:
+        while Q:
+            goal_state = best.get(puzzle.goalBoard)
+            if goal_state is not None and goal_state.g <= Q[0][0]:
+                break
+            current_state = heapq.heappop(Q)[3]
+            if current_state is not best[current_state.board] or current_state.board in closed:
+                continue # stale entry
+            closed.add(current_state.board)
+
+            expanded += 1
+            if control is not None and (expanded % POLLINTERVAL == 0 or expanded >= control.nodeLimit):
+                status = control.poll(expanded)
+                if status is not None:
+                    if moves is not None:
+                        status = SOLVED
+                    return endSearch(stats, SearchResult(status, moves, expanded, duplicates, generated, suboptimality))
+            sample = stats is not None and stats.expand(current_state.g, len(Q), generated, duplicates)
+            if sample:
+                startTime = time.perf_counter()
+                heuristicTime = 0.0
+            children = successor(puzzle, current_state)
+            if sample:
+                successorTime = time.perf_counter()
+                stats.addTime(SUCCESSOR, successorTime - startTime)
+            generated += len(children)
+            parentH = heuristic[current_state.board]
+            for child in children:
+                old = best.get(child.board)
+                if old is not None and old.g <= child.g:
+                    duplicates += 1
+                    continue
+                best[child.board] = child
+                if old is None:
+                    if sample:
+                        heuristicStart = time.perf_counter()
+                    heuristic[child.board] = childHeuristic(puzzle, pdb, parentH, current_state, child)
+                    if sample:
+                        heuristicTime += time.perf_counter() - heuristicStart
+                hValue = heuristic[child.board]
+                if child.board in closed:
+                    incons[child.board] = child
+                else:
+                    heapq.heappush(Q, (child.g + weight * hValue, hValue, next(tie), child))
+            if sample:
+                stats.addTime(HEURISTIC, heuristicTime)
+                stats.addTime(BOOKKEEPING, time.perf_counter() - successorTime - heuristicTime)
+
+        goal_state = best.get(puzzle.goalBoard)
+        if goal_state is None:
+            return endSearch(stats, SearchResult(UNSOLVABLE, None, expanded, duplicates, generated))
+        # The boards left to expand, to be ordered on the next weight. Every
+        # path shorter than the solution runs through one of them, so none
+        # is shorter than their lowest g + h. With an inconsistent h that
+        # may still be below the solution's length after a round with
+        # weight 1, and the rounds go on until it isn't.
+        frontier = {}
+        for entry in Q:
+            state = entry[3]
+            if state is best[state.board] and state.board not in closed:
+                frontier[state.board] = state
+        frontier.update(incons)
+        lowest = min([state.g + heuristic[board] for board, state in frontier.items()], default=goal_state.g)
+        bound = 1.0 if lowest >= goal_state.g else goal_state.g / lowest
+        if moves is None or goal_state.g < len(moves) or bound < suboptimality:
+            moves = getSolution(goal_state)
+            suboptimality = bound
+            if onSolution is not None:
+                onSolution(list(moves), suboptimality)
+        if suboptimality == 1.0:
+            return endSearch(stats, SearchResult(SOLVED, moves, expanded, duplicates, generated))
+
+        weight = max(1.0, weight - weightStep)
+        Q = [(state.g + weight * heuristic[board], heuristic[board], next(tie), state) for board, state in frontier.items()]
+        heapq.heapify(Q)
+        closed = set()
+        incons = {}
+
+
+FOUND = -1
+STOPPED = -2
+
+
+def IDAStar(puzzle, init_state, control=None, stats=None):
+    # Iterative deepening A*: repeated depth-first searches bounded by
+    # f = g + h, each time raising the bound to the smallest f that exceeded
+    # it. Moves are made and unmade on a single tile list and the move that
+    # undoes the previous one is never tried, so memory only grows with the
+    # depth of the current path.
+    if not isSolvable(puzzle, init_state.board, init_state.blank):
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    tiles = boardTiles(puzzle, init_state.board)
+    where = boardWhere(puzzle, init_state.board)
+    neighbors = puzzle.neighbors
+    distance = puzzle.distance
+    pdb = getPatternDatabase(puzzle)
+    # Without a pattern database h is Manhattan distance plus linear
+    # conflict, and every move updates it from the moved tile's distances and
+    # the conflicts of the line it changes, if any, kept per line in conflicts.
+    lineCells = puzzle.lineCells
+    conflictLine = puzzle.conflictLine
+    lineCaches = puzzle.lineConflicts
+    conflicts = [lineConflict(puzzle, line, tuple([tiles[cell] for cell in cells])) for line, cells in enumerate(lineCells)]
+    path = []
+    expanded = 0
+    generated = 0
+    stopStatus = None
+
+    def search(blank, prevBlank, g, hValue, bound):
+        nonlocal expanded, generated, stopStatus
+        f = g + hValue
+        if f > bound:
+            return f
+        if hValue == 0:
+            return FOUND
+        expanded += 1
+        if control is not None and (expanded % POLLINTERVAL == 0 or expanded >= control.nodeLimit):
+            stopStatus = control.poll(expanded, bound)
+            if stopStatus is not None:
+                return STOPPED
+        # Time spent in the recursive calls is not this expansion's, so a
+        # sampled expansion only times how its children's h is computed
+        # against the rest of making and unmaking the moves.
+        sample = stats is not None and stats.expand(g, len(path), generated, 0)
+        if sample:
+            startTime = time.perf_counter()
+            heuristicTime = 0.0
+        minimum = float("inf")
+        for move, newBlank in neighbors[blank]:
+            if newBlank == prevBlank:
+                continue
+            generated += 1
+            tile = tiles[newBlank]
+            tiles[blank], tiles[newBlank] = tile, 0
+            where[tile], where[0] = blank, newBlank
+            if sample:
+                heuristicStart = time.perf_counter()
+            if pdb is None:
+                childH = hValue + distance[tile][blank] - distance[tile][newBlank]
+                line = conflictLine[blank][newBlank][tile]
+                if line >= 0:
+                    conflict = conflicts[line]
+                    lineTiles = tuple([tiles[cell] for cell in lineCells[line]])
+                    newConflict = lineCaches[line].get(lineTiles)
+                    if newConflict is None:
+                        newConflict = lineConflict(puzzle, line, lineTiles)
+                    conflicts[line] = newConflict
+                    childH += newConflict - conflict
+            else:
+                childH = pdb.lookup(where)
+            if sample:
+                heuristicTime += time.perf_counter() - heuristicStart
+                recursionStart = time.perf_counter()
+            path.append(move)
+            t = search(newBlank, blank, g + 1, childH, bound)
+            if t == FOUND or t == STOPPED:
+                return t
+            path.pop()
+            tiles[blank], tiles[newBlank] = 0, tile
+            where[tile], where[0] = newBlank, blank
+            if pdb is None and line >= 0:
+                conflicts[line] = conflict
+            if sample:
+                startTime += time.perf_counter() - recursionStart
+            if t < minimum:
+                minimum = t
+        if sample:
+            stats.addTime(HEURISTIC, heuristicTime)
+            stats.addTime(SUCCESSOR, time.perf_counter() - startTime - heuristicTime)
+        return minimum
+
+    hValue = h(puzzle, init_state.board)
+    bound = hValue
+    while True:
+        t = search(init_state.blank, None, 0, hValue, bound)
+        if t == FOUND:
+            return endSearch(stats, SearchResult(SOLVED, path, expanded, 0, generated))
+        if t == STOPPED:
+            return endSearch(stats, SearchResult(stopStatus, None, expanded, 0, generated))
+        bound = t
+
+
+# Hash-distributed A* (HDA*) over worker processes. Every board is owned by
+# one worker, chosen by its Zobrist hash, and only the owner keeps it in an
+# open list and in its table of best g values, parents and moves. A worker
+# expands its own best boards and sends every child to the child's owner,
+# HDABATCH children to a message. The first solution found is only an upper
+# bound: workers prune every board whose f reaches the best solution so far,
+# and the search is over once none of them has anything left below it and
+# no batch is still on its way. The main process checks that with rounds of
+# probes that every worker answers with its counts of batches sent and
+# received; two rounds in a row of idle workers with the same, balanced
+# counts mean no batch was in flight in between (the four-counter method).
+# The path is then traced back through the owners of the parent boards.
+HDABATCH = 64 # children sent to a worker in one message
+HDACHUNK = 256 # expansions between two looks at a worker's inbox
+HDAPROBEINTERVAL = 0.01 # seconds between two probe rounds
+HDAWAIT = 1.0 # seconds to wait for a worker's message before checking that all are alive
+
+
+def zobristHash(puzzle, board):
+    value = 0
+    for cell, tile in enumerate(boardTiles(puzzle, board)):
+        value ^= puzzle.zobrist[cell][tile]
+    return value
+
+
+def hdaWorker(width, height, workerId, inboxes, results, collectStats):
+    puzzle = getPuzzle(width, height)
+    pdb = getPatternDatabase(puzzle)
+    zobrist = puzzle.zobrist
+    inbox = inboxes[workerId]
+    workers = len(inboxes)
+    stats = SearchStats() if collectStats else None
+    openList = []
+    best = {} # board: (g, parent board, move)
+    tie = itertools.count()
+    outboxes = [[] for i in range(workers)]
+    bound = float("inf") # length of the best solution found so far
+    sent = 0
+    received = 0
+    expanded = 0
+    generated = 0
+    duplicates = 0
+
+    def add(node):
+        nonlocal duplicates
+        board, blank, g, hValue, hashValue, parent, move = node
+        if g >= best.get(board, (g + 1,))[0]:
+            duplicates += 1
+            return
+        best[board] = (g, parent, move)
+        if g + hValue < bound:
+            heapq.heappush(openList, (g + hValue, hValue, next(tie), g, board, blank, hashValue))
+
+    def flush():
+        nonlocal sent
+        for owner, nodes in enumerate(outboxes):
+            if nodes:
+                inboxes[owner].put(("nodes", nodes))
+                outboxes[owner] = []
+                sent += 1
+
+    def idle():
+        return not openList or openList[0][0] >= bound
+
+    while True:
+        # Read every message waiting, but only wait for one when there is
+        # nothing to expand.
+        try:
+            message = inbox.get(idle())
+        except queue.Empty:
+            message = None
+        if message is not None:
+            kind = message[0]
+            if kind == "nodes":
+                received += 1
+                for node in message[1]:
+                    add(node)
+            elif kind == "bound":
+                bound = min(bound, message[1])
+            elif kind == "probe":
+                flush()
+                results.put(("probe", message[1], sent, received, idle(), expanded))
+            elif kind == "trace":
+                g, parent, move = best[message[1]]
+                results.put(("parent", parent, move))
+            elif kind == "stop":
+                for other in inboxes:
+                    other.cancel_join_thread()
+                results.put(("done", workerId, expanded, generated, duplicates, stats))
+                return
+            continue
+
+        for i in range(HDACHUNK):
+            if idle():
+                break
+            f, hValue, t, g, board, blank, hashValue = heapq.heappop(openList)
+            if g > best[board][0]:
+                continue # stale entry
+            if board == puzzle.goalBoard:
+                bound = g
+                results.put(("solution", g))
+                continue
+            expanded += 1
+            if stats is not None:
+                stats.expand(g, len(openList), generated, duplicates)
+            for move, newBlank in puzzle.neighbors[blank]:
+                child = slideTile(puzzle, board, blank, newBlank)
+                generated += 1
+                if pdb is None:
+                    childH = hValue + heuristicDelta(puzzle, board, blank, child, newBlank)
+                else:
+                    childH = pdb.lookup(boardWhere(puzzle, child))
+                if g + 1 + childH >= bound:
+                    continue
+                tile = (board >> (newBlank * puzzle.tileBits)) & puzzle.tileMask
+                childHash = hashValue ^ zobrist[newBlank][tile] ^ zobrist[blank][tile] ^ zobrist[blank][0] ^ zobrist[newBlank][0]
+                node = (child, newBlank, g + 1, childH, childHash, board, move)
+                owner = childHash % workers
+                if owner == workerId:
+                    add(node)
+                else:
+                    outboxes[owner].append(node)
+                    if len(outboxes[owner]) >= HDABATCH:
+                        inboxes[owner].put(("nodes", outboxes[owner]))
+                        outboxes[owner] = []
+                        sent += 1
+        flush()
+
+
+def parallelAStar(puzzle, init_state, control=None, stats=None, processes=None):
+    # HDA* on processes worker processes, one per CPU if not given. It can't
+    # run inside a daemonic process, such as a multiprocessing.Pool worker.
+    if not isSolvable(puzzle, init_state.board, init_state.blank):
+        return endSearch(stats, SearchResult(UNSOLVABLE))
+    if init_state.board == puzzle.goalBoard:
+        return endSearch(stats, SearchResult(SOLVED, []))
+    if multiprocessing.current_process().daemon:
+        raise ValueError("parallelAStar can't start worker processes from a daemonic process")
+    workers = processes or os.cpu_count() or 1
+    inboxes = [multiprocessing.Queue() for i in range(workers)]
+    results = multiprocessing.Queue()
+    pool = []
+    for workerId in range(workers):
+        process = multiprocessing.Process(target=hdaWorker, args=(puzzle.width, puzzle.height, workerId, inboxes, results, stats is not None))
+        process.daemon = True
+        process.start()
+        pool.append(process)
+
+    def receive():
+        # The next message from the workers, or None once a worker has died
+        # (or stopped, after "stop") without sending it.
+        while True:
+            try:
+                return results.get(timeout=HDAWAIT)
+            except queue.Empty:
+                if not all(process.is_alive() for process in pool):
+                    return None
+
+    rootHash = zobristHash(puzzle, init_state.board)
+    root = (init_state.board, init_state.blank, 0, h(puzzle, init_state.board), rootHash, None, None)
+    inboxes[rootHash % workers].put(("nodes", [root]))
+    bound = None
+    status = None
+    expanded = 0
+    probeRound = 0
+    lastCounts = None
+    while status is None:
+        probeRound += 1
+        for inbox in inboxes:
+            inbox.put(("probe", probeRound))
+        replies = []
+        while len(replies) < workers:
+            message = receive()
+            if message is None:
+                break
+            if message[0] == "solution":
+                if bound is None or message[1] < bound:
+                    bound = message[1]
+                    for inbox in inboxes:
+                        inbox.put(("bound", bound))
+            elif message[1] == probeRound:
+                replies.append(message)
+        if len(replies) < workers:
+            status = FAILED
+            break
+        sent = 1 + sum(reply[2] for reply in replies) # the root's batch came from here
+        received = sum(reply[3] for reply in replies)
+        expanded = sum(reply[5] for reply in replies)
+        counts = (sent, received) if all(reply[4] for reply in replies) and sent == received else None
+        if counts is not None and counts == lastCounts:
+            status = SOLVED if bound is not None else UNSOLVABLE
+            break
+        lastCounts = counts
+        if control is not None:
+            status = control.poll(expanded, bound)
+        time.sleep(HDAPROBEINTERVAL)
+
+    solution = None
+    if status == SOLVED:
+        solution = []
+        board = puzzle.goalBoard
+        while True:
+            inboxes[zobristHash(puzzle, board) % workers].put(("trace", board))
+            message = receive()
+            while message is not None and message[0] != "parent":
+                message = receive()
+            if message is None:
+                status = FAILED
+                break
+            board, move = message[1], message[2]
+            if board is None:
+                break
+            solution.append(move)
+        solution = solution[::-1] if status == SOLVED else None
+
+    for inbox in inboxes:
+        inbox.put(("stop",))
+        if status == FAILED:
+            inbox.cancel_join_thread() # its reader may be gone
+    expanded = 0
+    generated = 0
+    duplicates = 0
+    done = 0
+    while done < workers:
+        message = receive()
+        if message is None:
+            break # its counts are lost with it
+        if message[0] == "done":
+            done += 1
+            expanded, generated, duplicates = expanded + message[2], generated + message[3], duplicates + message[4]
+            if stats is not None:
+                stats.merge(message[5])
+    for process in pool:
+        process.join(1)
+        if process.is_alive():
+            process.terminate()
+    return endSearch(stats, SearchResult(status, solution, expanded, duplicates, generated))
+
+
+# Solvers by the names the command line tools use.
+SOLVERS = {
+    "bfs": BFS,
+    "bibfs": bidirectionalBFS,
+    "layerbfs": layerBFS,
+    "astar": AStar,
+    "idastar": IDAStar,
+    "hdastar": parallelAStar,
+    "arastar": ARAStar,
+    "table": tableSolve,
+}
+
+
+# Solvers whose solutions are always optimal, and so may be cached.
+OPTIMALSOLVERS = {BFS, bidirectionalBFS, layerBFS, AStar, IDAStar, parallelAStar, tableSolve}
+
+
+# Optimal solutions of earlier searches. Every board on a stored path is
+# kept with its distance to the goal and the next move of the path, so a
+# later query for any of them is answered by following the moves. The
+# capacity most recently used boards are kept in memory and, given a file
+# name, all of them in a SQLite database that outlives the process. A cache
+# may be used by one thread at a time, which need not be the one that made
+# it.
+CACHEFILE = os.path.join(TABLEDIR, "solutions.sqlite")
+
+
+class SolutionCache:
+    def __init__(self, fileName=None, capacity=1 << 18):
+        self.capacity = capacity
+        self.memory = collections.OrderedDict() # (width, height, board): (distance, move)
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if fileName is not None:
+            self.db = sqlite3.connect(fileName, timeout=30, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (width INTEGER, height INTEGER, board BLOB, "
+                            "distance INTEGER, move TEXT, PRIMARY KEY (width, height, board)) WITHOUT ROWID")
+            self.db.commit()
+
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def peek(self, puzzle, board):
+        # Distance of a board if it is in memory, None otherwise. Cheap
+        # enough to be called for every board a search generates.
+        entry = self.memory.get((puzzle.width, puzzle.height, board))
+        return None if entry is None else entry[0]
+
+    def get(self, puzzle, board):
+        # (distance, move) of a board, from memory or else from the database.
+        key = (puzzle.width, puzzle.height, board)
+        entry = self.memory.get(key)
+        if entry is None and self.db is not None:
+            entry = self.db.execute("SELECT distance, move FROM solutions WHERE width = ? AND height = ? AND board = ?",
+                                    (puzzle.width, puzzle.height, packedKey(puzzle, board))).fetchone()
+        if entry is not None:
+            self.remember(key, entry)
+        return entry
+
+    def solution(self, puzzle, board, blank):
+        # The moves from board to the goal, or None if they are not known.
+        moves = []
+        while board != puzzle.goalBoard:
+            entry = self.get(puzzle, board)
+            if entry is None:
+                return None
+            moves.append(entry[1])
+            newBlank = blank + puzzle.steps[entry[1]]
+            board, blank = slideTile(puzzle, board, blank, newBlank), newBlank
+        return moves
+
+    def store(self, puzzle, board, blank, moves):
+        # Store every board of the optimal solution moves of board.
+        rows = []
+        for i, move in enumerate(moves):
+            self.remember((puzzle.width, puzzle.height, board), (len(moves) - i, move))
+            rows.append((puzzle.width, puzzle.height, packedKey(puzzle, board), len(moves) - i, move))
+            newBlank = blank + puzzle.steps[move]
+            board, blank = slideTile(puzzle, board, blank, newBlank), newBlank
+        if self.db is not None and rows:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def packedKey(puzzle, board):
+    # A packed board as bytes, since it may not fit in SQLite's 64-bit integers.
+    return board.to_bytes((puzzle.numCells * puzzle.tileBits + 7) // 8, "big")
+
+
+def cachedSolve(cache, solver, puzzle, init_state, control=None, stats=None):
+    # Answer from cache if it knows the board, search with solver otherwise
+    # and store what it finds if it is one of OPTIMALSOLVERS or was proved
+    # optimal anyway.
+    moves = cache.solution(puzzle, init_state.board, init_state.blank)
+    if moves is not None:
+        cache.hits += 1
+        return endSearch(stats, SearchResult(SOLVED, moves))
+    cache.misses += 1
+    if solver is AStar:
+        result = AStar(puzzle, init_state, control, stats, cache)
+    else:
+        result = solver(puzzle, init_state, control, stats)
+    if result.status == SOLVED and (solver in OPTIMALSOLVERS or result.suboptimality == 1.0):
+        cache.store(puzzle, init_state.board, init_state.blank, result.moves)
+    return result
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["build-dist"]:
+        # python solver.py build-dist
+        buildDistanceTable()
+    elif sys.argv[1:2] == ["build-pdb"]:
+        # python solver.py build-pdb [WIDTH HEIGHT]
+        if len(sys.argv) == 4:
+            buildPatternDatabases(int(sys.argv[2]), int(sys.argv[3]))
+        else:
+            buildPatternDatabases(3, 3)
+    else:
+        print("usage: python solver.py build-dist | build-pdb [WIDTH HEIGHT]")
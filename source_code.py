@@ -1,14 +1,21 @@
-import pygame, sys, random
+import pygame, sys
 from pygame.locals import *
-import queue
+import concurrent.futures, functools, os, time
+from solver import *
+import generate
 
-BOARDWIDTH = 3
-BOARDHEIGHT = 3
+BOARDWIDTH = 3 # number of columns in the board, unless given on the command line
+BOARDHEIGHT = 3 # number of rows in the board
+BOARDAREA = 444 # the board is scaled to fit in a square this many pixels wide
 TILESIZE = 148
 WINDOWWIDTH = 1280
 WINDOWHEIGHT = 680
-FPS = 30
-BLANK = None
+FPS = 30 # frames per second of the slide animations
+PLAYBACKSECONDS = 5 # longest a solution takes to play back, see playMoves()
+PROGRESSINTERVAL = 100 # milliseconds between two redraws of a running search's progress
+SOLVEDONE = USEREVENT # posted by the worker thread when a search ends
+PICTUREFILE = "tiger.png"
+NEWGAMEMOVES = 10 # optimal solution length of the boards New Game deals
 
 #                 R    G    B
 BLACK =         (  0,   0,   0)
@@ -21,6 +28,8 @@ BGCOLOR = DARKTURQUOISE
 TEXTCOLOR = WHITE
 BORDERCOLOR = BRIGHTBLUE
 BASICFONTSIZE = 25
+MESSAGEHEIGHT = 40 # the message in the upper left corner stays above this
+STATSLINEHEIGHT = 35
 
 BUTTONCOLOR = WHITE
 BUTTONTEXTCOLOR = BLACK
@@ -28,41 +37,102 @@ MESSAGECOLOR = WHITE
 
 XMARGIN = int((WINDOWWIDTH - (TILESIZE * BOARDWIDTH + (BOARDWIDTH - 1))) / 9)
 YMARGIN = int((WINDOWHEIGHT - (TILESIZE * BOARDHEIGHT + (BOARDHEIGHT - 1))) / 3.5)
+PUZZLE = None # solver.Puzzle of the board size being played
 
-UP = "up"
-DOWN = "down"
-LEFT = "left"
-RIGHT = "right"
+# How long and how much memory a search started from the window may use.
+SOLVESECONDS = 120
+SOLVEMEMORY = 2 * 1024 ** 3 # bytes
+SOLVEFASTSECONDS = 5 # ARA* plays the best solution it has after this long
+
+SOLVEJOB = None # (future, control, stats, solutions) of the search running in the background, if any
+SOLVECACHE = None # SolutionCache the searches started from the window share
+SHOWN = None # (board, message, stats lines, cancel) on the screen, see refresh()
 
 def main():
-    global FPSCLOCK, DISPLAYSURF, BASICFONT, RESET_SURF, RESET_RECT, NEW_SURF, NEW_RECT, SOLVEBFS_SURF, SOLVEBFS_RECT, SOLVEASTAR_SURF, SOLVEASTAR_RECT
+    global FPSCLOCK, DISPLAYSURF, BASICFONT, RESET_SURF, RESET_RECT, NEW_SURF, NEW_RECT, SOLVEBFS_SURF, SOLVEBFS_RECT, SOLVEASTAR_SURF, SOLVEASTAR_RECT, SOLVEIDASTAR_SURF, SOLVEIDASTAR_RECT, SOLVETABLE_SURF, SOLVETABLE_RECT, SOLVEFAST_SURF, SOLVEFAST_RECT, CANCEL_SURF, CANCEL_RECT, SOLVERPOOL, SOLVEJOB, SOLVECACHE, SHOWN, PICTURE, TILEIMAGES, TILELABELS
+
+    # python source_code.py [WIDTH HEIGHT]
+    if len(sys.argv) == 3:
+        setBoardSize(int(sys.argv[1]), int(sys.argv[2]))
+    else:
+        setBoardSize(BOARDWIDTH, BOARDHEIGHT)
 
     pygame.init()
     FPSCLOCK = pygame.time.Clock()
     DISPLAYSURF = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
     pygame.display.set_caption("Slide Puzzle")
     BASICFONT = pygame.font.Font("freesansbold.ttf", BASICFONTSIZE)
+    PICTURE, TILEIMAGES, TILELABELS = loadAssets()
 
     # Store the option buttons and their rectangles in OPTIONS.
-    RESET_SURF, RESET_RECT = makeText("Reset",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 150)
-    NEW_SURF,   NEW_RECT   = makeText("New Game", BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 115)
-    SOLVEBFS_SURF, SOLVEBFS_RECT = makeText("Solve using BFS",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 80)
-    SOLVEASTAR_SURF, SOLVEASTAR_RECT = makeText("Solve using A*",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 45)
-
-    mainBoard = generateNewPuzzle(10)
-    SOLVEDBOARD = getStartingBoard() # a solved board is the same as the board in a start state.
+    RESET_SURF, RESET_RECT = makeText("Reset",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 220)
+    NEW_SURF,   NEW_RECT   = makeText("New Game", BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 185)
+    SOLVEBFS_SURF, SOLVEBFS_RECT = makeText("Solve using BFS",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 150)
+    SOLVEASTAR_SURF, SOLVEASTAR_RECT = makeText("Solve using A*",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 115)
+    SOLVEIDASTAR_SURF, SOLVEIDASTAR_RECT = makeText("Solve using IDA*",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 80)
+    SOLVETABLE_SURF, SOLVETABLE_RECT = makeText("Solve using table",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 45)
+    SOLVEFAST_SURF, SOLVEFAST_RECT = makeText("Solve fast (ARA*)",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 290)
+    CANCEL_SURF, CANCEL_RECT = makeText("Cancel",    BUTTONTEXTCOLOR, BUTTONCOLOR, WINDOWWIDTH - 220, WINDOWHEIGHT - 255)
+
+    # Searches run on a worker thread so the window keeps drawing while they run.
+    SOLVERPOOL = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    # Solutions are remembered across games and runs, so boards seen before
+    # are solved without searching.
+    if not os.path.isdir(TABLEDIR):
+        os.makedirs(TABLEDIR)
+    SOLVECACHE = SolutionCache(CACHEFILE)
+
+    mainBoard = generateNewPuzzle(NEWGAMEMOVES)
+    SOLVEDBOARD = getStartingBoard(BOARDWIDTH, BOARDHEIGHT) # a solved board is the same as the board in a start state.
     allMoves = [] # list of moves made from the solved configuration
+    statusMsg = None # outcome of the last search that did not solve the board
+    searchStats = None # SearchStats of the running or last search
 
     while True: # main game loop
         slideTo = None # the direction, if any, a tile should slide
         msg = "Click tile or press arrow keys to slide." # contains the message to show in the upper left corner.
         if mainBoard == SOLVEDBOARD:
             msg = "Solved!"
+        if statusMsg:
+            msg = statusMsg
+
+        if SOLVEJOB is not None and SOLVEJOB[0].done():
+            result = SOLVEJOB[0].result()
+            SOLVEJOB = None
+            if result.status == SOLVED:
+                playMoves(mainBoard, result.moves, "Solving...")
+                allMoves = []
+                continue
+            msg = statusMsg = STATUSMESSAGES[result.status]
+
+        if SOLVEJOB is not None:
+            control = SOLVEJOB[1]
+            msg = "Solving... %d nodes expanded" % control.expanded
+            if SOLVEJOB[3]:
+                # ARA* plays the best of these if it is cancelled or runs out of time
+                length, suboptimality = SOLVEJOB[3][-1]
+                msg += ", %d moves found, at most %.2f times optimal" % (length, suboptimality)
+            elif control.bound is not None:
+                msg += ", f-bound %d" % control.bound
+            searchStats = SOLVEJOB[2]
+        refresh(mainBoard, msg, searchStats, SOLVEJOB is not None)
+
+        # Nothing changes on its own while no search runs, so sleep until
+        # there is an event.
+        for event in waitForEvents(PROGRESSINTERVAL if SOLVEJOB is not None else None): # event handling loop
+            if event.type == QUIT or (event.type == KEYUP and event.key == K_ESCAPE):
+                terminate()
+            if event.type == VIDEOEXPOSE:
+                SHOWN = None # the window was uncovered, put all of it on the screen again
+            if SOLVEJOB is not None:
+                # the board can't change while it is being solved
+                if event.type == MOUSEBUTTONUP and CANCEL_RECT.collidepoint(event.pos):
+                    SOLVEJOB[1].cancel()
+                continue
+            if event.type in (MOUSEBUTTONUP, KEYUP):
+                statusMsg = None
+                searchStats = None
 
-        drawBoard(mainBoard, msg)
-
-        checkForQuit()
-        for event in pygame.event.get(): # event handling loop
             if event.type == MOUSEBUTTONUP:
                 spotx, spoty = getSpotClicked(mainBoard, event.pos[0], event.pos[1])
 
@@ -72,52 +142,23 @@ def main():
                         resetAnimation(mainBoard, allMoves) # clicked on Solve button
                         allMoves = []
                     elif NEW_RECT.collidepoint(event.pos):
-                        mainBoard = generateNewPuzzle(10) # clicked on New Game button
+                        mainBoard = generateNewPuzzle(NEWGAMEMOVES) # clicked on New Game button
                         allMoves = []
                     elif SOLVEBFS_RECT.collidepoint(event.pos):
-                        msg = "Solving..."
-                        drawBoard(mainBoard, msg)
-                        pygame.display.update()
-                        init_state = State(mainBoard, None, None)
-                        solution_state = BFS(init_state)
-                        solution = []
-                        if (solution_state != State([], None, None)):
-                            solution = []
-                            while solution_state.parent_state is not None:
-                                checkForQuit()
-                                solution.append(solution_state.move)
-                                solution_state = solution_state.parent_state
-                            solution.reverse()
-                            for i in range(len(solution)):
-                                slideAnimation(mainBoard, solution[i], "Solving...", animationSpeed=int(TILESIZE / 3))
-                                makeMove(mainBoard, solution[i])
-                            allMoves = []
-                        else:
-                            msg = "Can't solve!"
-                            drawBoard(mainBoard, msg)
-                            pygame.display.update()
+                        SOLVEJOB = startSolve(mainBoard, bidirectionalBFS)
                     elif SOLVEASTAR_RECT.collidepoint(event.pos):
-                        msg = "Solving..."
-                        drawBoard(mainBoard, msg)
-                        pygame.display.update()
-                        init_state = State(mainBoard, None, None)
-                        solution_state = AStar(init_state)
-                        solution = []
-                        if (solution_state != State([], None, None)):
-                            solution = []
-                            while solution_state.parent_state is not None:
-                                checkForQuit()
-                                solution.append(solution_state.move)
-                                solution_state = solution_state.parent_state
-                            solution.reverse()
-                            for i in range(len(solution)):
-                                slideAnimation(mainBoard, solution[i], "Solving...", animationSpeed=int(TILESIZE / 3))
-                                makeMove(mainBoard, solution[i])
-                            allMoves = []
+                        SOLVEJOB = startSolve(mainBoard, AStar)
+                    elif SOLVEIDASTAR_RECT.collidepoint(event.pos):
+                        SOLVEJOB = startSolve(mainBoard, IDAStar)
+                    elif SOLVETABLE_RECT.collidepoint(event.pos):
+                        if (BOARDWIDTH, BOARDHEIGHT) != (3, 3):
+                            statusMsg = "The table only solves 3x3 boards."
+                        elif getDistanceTable(PUZZLE) is None:
+                            statusMsg = "Run build-dist to create the 3x3 table first."
                         else:
-                            msg = "Can't solve!"
-                            drawBoard(mainBoard, msg)
-                            pygame.display.update()
+                            SOLVEJOB = startSolve(mainBoard, tableSolve)
+                    elif SOLVEFAST_RECT.collidepoint(event.pos):
+                        SOLVEJOB = startSolve(mainBoard, ARAStar, SOLVEFASTSECONDS)
                 else:
                     # check if the clicked tile was next to the blank spot
 
@@ -146,15 +187,36 @@ def main():
             slideAnimation(mainBoard, slideTo, "Click tile or press arrow keys to slide.", 8) # show slide on screen
             makeMove(mainBoard, slideTo)
             allMoves.append(slideTo) # record the slide
-        pygame.display.update()
-        FPSCLOCK.tick(FPS)
+
+
+def setBoardSize(width, height):
+    # Play on a board of width columns and height rows. The tiles are sized
+    # so that the board fits in BOARDAREA.
+    global BOARDWIDTH, BOARDHEIGHT, TILESIZE, XMARGIN, YMARGIN, PUZZLE
+    PUZZLE = getPuzzle(width, height)
+    BOARDWIDTH, BOARDHEIGHT = width, height
+    TILESIZE = BOARDAREA // max(width, height)
+    XMARGIN = int((WINDOWWIDTH - (TILESIZE * BOARDWIDTH + (BOARDWIDTH - 1))) / 9)
+    YMARGIN = int((WINDOWHEIGHT - (TILESIZE * BOARDHEIGHT + (BOARDHEIGHT - 1))) / 3.5)
 
 
 def terminate():
+    if SOLVEJOB is not None:
+        SOLVEJOB[1].cancel() # let the worker thread finish
     pygame.quit()
     sys.exit()
 
 
+def waitForEvents(timeout=None):
+    # Sleep until there is an event, or for at most timeout milliseconds, and
+    # return all the events there are.
+    if timeout is None:
+        event = pygame.event.wait()
+    else:
+        event = pygame.event.wait(timeout)
+    return [event] + pygame.event.get()
+
+
 def checkForQuit():
     for event in pygame.event.get(QUIT): # get all the QUIT events
         terminate() # terminate if any QUIT events are present
@@ -164,28 +226,10 @@ def checkForQuit():
         pygame.event.post(event) # put the other KEYUP event objects back
 
 
-def getStartingBoard():
-    # Return a board data structure with tiles in the solved state.
-    # For example, if BOARDWIDTH and BOARDHEIGHT are both 3, this function
-    # returns [[1, 4, 7], [2, 5, 8], [3, 6, BLANK]]
-    counter = 1
-    board = []
-    for x in range(BOARDWIDTH):
-        column = []
-        for y in range(BOARDHEIGHT):
-            column.append(counter)
-            counter += BOARDWIDTH
-        board.append(column)
-        counter -= BOARDWIDTH * (BOARDHEIGHT - 1) + BOARDWIDTH - 1
-
-    board[BOARDWIDTH-1][BOARDHEIGHT-1] = BLANK
-    return board
-
-
 def getBlankPosition(board):
     # Return the x and y of board coordinates of the blank space.
-    for x in range(BOARDWIDTH):
-        for y in range(BOARDHEIGHT):
+    for x in range(len(board)):
+        for y in range(len(board[0])):
             if board[x][y] == BLANK:
                 return (x, y)
 
@@ -212,24 +256,6 @@ def isValidMove(board, move):
            (move == RIGHT and blankx != 0)
 
 
-def getRandomMove(board, lastMove=None):
-    # start with a full list of all four moves
-    validMoves = [UP, DOWN, LEFT, RIGHT]
-
-    # remove moves from the list as they are disqualified
-    if lastMove == UP or not isValidMove(board, DOWN):
-        validMoves.remove(DOWN)
-    if lastMove == DOWN or not isValidMove(board, UP):
-        validMoves.remove(UP)
-    if lastMove == LEFT or not isValidMove(board, RIGHT):
-        validMoves.remove(RIGHT)
-    if lastMove == RIGHT or not isValidMove(board, LEFT):
-        validMoves.remove(LEFT)
-
-    # return a random move from the list of remaining moves
-    return random.choice(validMoves)
-
-
 def getLeftTopOfTile(tileX, tileY):
     left = XMARGIN + (tileX * TILESIZE) + (tileX - 1)
     top = YMARGIN + (tileY * TILESIZE) + (tileY - 1)
@@ -247,30 +273,43 @@ def getSpotClicked(board, x, y):
     return (None, None)
 
 
+def loadAssets():
+    # Load and convert every image once. Returns the picture shown next to the
+    # board, the tile images and the rendered tile numbers, both indexed by
+    # tile number. The 3x3 board has its own N.png tile images; on other
+    # sizes the tiles are cut out of the picture scaled to the board.
+    picture = pygame.image.load(PICTUREFILE).convert()
+    numTiles = BOARDWIDTH * BOARDHEIGHT - 1
+    tileImages = [None]
+    if (BOARDWIDTH, BOARDHEIGHT) == (3, 3) and all(os.path.exists("%d.png" % number) for number in range(1, numTiles + 1)):
+        for number in range(1, numTiles + 1):
+            tileImages.append(pygame.image.load("%d.png" % number).convert())
+    else:
+        tileImages.extend(makeTileImages(picture))
+    tileLabels = [None]
+    for number in range(1, numTiles + 1):
+        tileLabels.append(BASICFONT.render(str(number), True, TEXTCOLOR))
+    return picture, tileImages, tileLabels
+
+
+def makeTileImages(picture):
+    # Cut the picture scaled to the board into one image per tile, taking
+    # each tile from the cell it has in the solved board.
+    scaled = pygame.transform.smoothscale(picture, (TILESIZE * BOARDWIDTH, TILESIZE * BOARDHEIGHT))
+    tileImages = []
+    for number in range(1, BOARDWIDTH * BOARDHEIGHT):
+        x, y = (number - 1) % BOARDWIDTH, (number - 1) // BOARDWIDTH
+        tileImages.append(scaled.subsurface((x * TILESIZE, y * TILESIZE, TILESIZE, TILESIZE)).copy())
+    return tileImages
+
+
 def drawTile(tilex, tiley, number, adjx=0, adjy=0):
     # draw a tile at board coordinates tilex and tiley, optionally a few
     # pixels over (determined by adjx and adjy)
     left, top = getLeftTopOfTile(tilex, tiley)
 
-    if number == 1:
-        image = pygame.image.load("1.png")
-    elif number == 2:
-        image = pygame.image.load("2.png")
-    elif number == 3:
-        image = pygame.image.load("3.png")
-    elif number == 4:
-        image = pygame.image.load("4.png")
-    elif number == 5:
-        image = pygame.image.load("5.png")
-    elif number == 6:
-        image = pygame.image.load("6.png")
-    elif number == 7:
-        image = pygame.image.load("7.png")
-    elif number == 8:
-        image = pygame.image.load("8.png")
-
-    DISPLAYSURF.blit(image, (left + adjx, top + adjy))
-    textSurf = BASICFONT.render(str(number), True, TEXTCOLOR)
+    DISPLAYSURF.blit(TILEIMAGES[number], (left + adjx, top + adjy))
+    textSurf = TILELABELS[number]
     textRect = textSurf.get_rect()
     textRect.center = left + int(TILESIZE / 2) + adjx, top + int(TILESIZE / 2) + adjy
     DISPLAYSURF.blit(textSurf, textRect)
@@ -299,12 +338,59 @@ def drawBoard(board, message):
     width = BOARDWIDTH * TILESIZE
     height = BOARDHEIGHT * TILESIZE
     pygame.draw.rect(DISPLAYSURF, BORDERCOLOR, (left - 5, top - 5, width + 10, height + 10), 4)
-    image = pygame.image.load("tiger.png")
-    DISPLAYSURF.blit(image, (1.5 * (BOARDWIDTH * TILESIZE), YMARGIN))
+    DISPLAYSURF.blit(PICTURE, (1.5 * BOARDAREA, YMARGIN))
     DISPLAYSURF.blit(RESET_SURF, RESET_RECT)
     DISPLAYSURF.blit(NEW_SURF, NEW_RECT)
     DISPLAYSURF.blit(SOLVEBFS_SURF, SOLVEBFS_RECT)
     DISPLAYSURF.blit(SOLVEASTAR_SURF, SOLVEASTAR_RECT)
+    DISPLAYSURF.blit(SOLVEIDASTAR_SURF, SOLVEIDASTAR_RECT)
+    DISPLAYSURF.blit(SOLVETABLE_SURF, SOLVETABLE_RECT)
+    DISPLAYSURF.blit(SOLVEFAST_SURF, SOLVEFAST_RECT)
+
+
+def drawStats(lines):
+    # Overlay the counters of a search in the bottom left corner.
+    for i in range(len(lines)):
+        textSurf, textRect = makeText(lines[i], MESSAGECOLOR, BGCOLOR, 5, WINDOWHEIGHT - STATSLINEHEIGHT * (len(lines) - i))
+        DISPLAYSURF.blit(textSurf, textRect)
+
+
+def getTileRect(tileX, tileY):
+    left, top = getLeftTopOfTile(tileX, tileY)
+    return pygame.Rect(left, top, TILESIZE, TILESIZE)
+
+
+def refresh(board, message, stats=None, cancel=False):
+    # Draw the window with the counters of stats and the Cancel button if
+    # cancel is true, but only put the parts that changed since the last
+    # refresh on the screen: the cells whose tile changed with the gaps around
+    # them (a sliding tile is drawn over the gap), the message, the counters
+    # and the button.
+    global SHOWN
+    lines = stats.lines() if stats is not None else []
+    drawBoard(board, message)
+    if cancel:
+        DISPLAYSURF.blit(CANCEL_SURF, CANCEL_RECT)
+    drawStats(lines)
+    if SHOWN is None:
+        pygame.display.update()
+    else:
+        shownBoard, shownMessage, shownLines, shownCancel = SHOWN
+        rects = []
+        for tilex in range(len(board)):
+            for tiley in range(len(board[0])):
+                if board[tilex][tiley] != shownBoard[tilex][tiley]:
+                    rects.append(getTileRect(tilex, tiley).inflate(2, 2))
+        if message != shownMessage:
+            rects.append(pygame.Rect(0, 0, WINDOWWIDTH, MESSAGEHEIGHT))
+        if lines != shownLines:
+            height = STATSLINEHEIGHT * max(len(lines), len(shownLines))
+            rects.append(pygame.Rect(0, WINDOWHEIGHT - height, WINDOWWIDTH, height))
+        if cancel != shownCancel:
+            rects.append(CANCEL_RECT)
+        if rects:
+            pygame.display.update(rects)
+    SHOWN = ([column[:] for column in board], message, lines, cancel)
 
 
 def slideAnimation(board, direction, message, animationSpeed):
@@ -325,16 +411,18 @@ def slideAnimation(board, direction, message, animationSpeed):
         movey = blanky
 
     # prepare the base surface
-    drawBoard(board, message)
+    refresh(board, message)
     baseSurf = DISPLAYSURF.copy()
     # draw a blank space over the moving tile on the baseSurf Surface.
-    moveLeft, moveTop = getLeftTopOfTile(movex, movey)
-    pygame.draw.rect(baseSurf, BGCOLOR, (moveLeft, moveTop, TILESIZE, TILESIZE))
+    moveRect = getTileRect(movex, movey)
+    pygame.draw.rect(baseSurf, BGCOLOR, moveRect)
+    # only the cells of the tile and of the blank change, and the gap between them
+    dirtyRect = moveRect.union(getTileRect(blankx, blanky))
 
     for i in range(0, TILESIZE, animationSpeed):
         # animate the tile sliding over
         checkForQuit()
-        DISPLAYSURF.blit(baseSurf, (0, 0))
+        DISPLAYSURF.blit(baseSurf, dirtyRect, dirtyRect)
         if direction == UP:
             drawTile(movex, movey, board[movex][movey], 0, -i)
         if direction == DOWN:
@@ -344,232 +432,74 @@ def slideAnimation(board, direction, message, animationSpeed):
         if direction == RIGHT:
             drawTile(movex, movey, board[movex][movey], i, 0)
 
-        pygame.display.update()
+        pygame.display.update(dirtyRect)
         FPSCLOCK.tick(FPS)
 
 
-def generateNewPuzzle(numSlides):
-    # From a starting configuration, make numSlides number of moves (and
-    # animate these moves).
-    board = getStartingBoard()
-    drawBoard(board, "")
-    pygame.display.update()
-    pygame.time.wait(500) # pause 500 milliseconds for effect
-    lastMove = None
-    for i in range(numSlides):
-        move = getRandomMove(board, lastMove)
-        slideAnimation(board, move, "Generating new puzzle...", animationSpeed=int(TILESIZE / 3))
-        makeMove(board, move)
-        lastMove = move
-    return board
+def playMoves(board, moves, message):
+    # Make and animate moves within about PLAYBACKSECONDS, going by the clock
+    # rather than by the frame rate. Each slide gets its share of the time,
+    # at most the usual three frames; a slide that is already late is made
+    # without animation. Once the share is under two frames no slide is
+    # animated and every frame shows all the moves due by then.
+    startTime = time.monotonic()
+    secondsPerMove = PLAYBACKSECONDS / max(1, len(moves))
+    framesPerMove = int(secondsPerMove * FPS)
+    if framesPerMove >= 2:
+        speed = max(int(TILESIZE / 3), -(-TILESIZE // framesPerMove))
+        for i, move in enumerate(moves):
+            if time.monotonic() - startTime < (i + 1) * secondsPerMove:
+                slideAnimation(board, move, message, speed)
+            makeMove(board, move)
+        return
+    done = 0
+    while done < len(moves):
+        checkForQuit()
+        due = min(len(moves), int((time.monotonic() - startTime) / secondsPerMove) + 1)
+        while done < due:
+            makeMove(board, moves[done])
+            done += 1
+        refresh(board, message)
+        FPSCLOCK.tick(FPS)
+
+
+def generateNewPuzzle(numMoves):
+    # Return a board whose shortest solution is exactly numMoves moves, or
+    # as many as the hardest boards of a small size take. It is made without
+    # any animation, see generate.py.
+    if generate.deepest(PUZZLE) is not None:
+        numMoves = min(numMoves, generate.deepest(PUZZLE))
+    cells = generate.generateBoard(PUZZLE, numMoves)
+    return unpackBoard(PUZZLE, parseBoard(PUZZLE, cells).board)
 
 
 def resetAnimation(board, allMoves):
     # make all of the moves in allMoves in reverse.
-    revAllMoves = allMoves[:] # gets a copy of the list
-    revAllMoves.reverse()
-
-    for move in revAllMoves:
-        if move == UP:
-            oppositeMove = DOWN
-        elif move == DOWN:
-            oppositeMove = UP
-        elif move == RIGHT:
-            oppositeMove = LEFT
-        elif move == LEFT:
-            oppositeMove = RIGHT
-        slideAnimation(board, oppositeMove, "", animationSpeed=int(TILESIZE / 3))
-        makeMove(board, oppositeMove)
-
-
-class State:
-    def __init__(self, matrix_state, parent_state, move):
-        self.matrix_state = matrix_state
-        self.parent_state = parent_state
-        self.move = move
-        self.g = 0
-        self.f = 0
-
-
-def h(matrix_state):
-    distance = 0
-    solveBoard = getStartingBoard()
-    for i in range(len(matrix_state)):
-        for j in range(len(matrix_state[0])):
-            if matrix_state[i][j] == 1:
-                x_distance = 0 - i
-                y_distance = 0 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-            elif matrix_state[i][j] == 2:
-                x_distance = 1 - i
-                y_distance = 0 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-            elif matrix_state[i][j] == 3:
-                x_distance = 2 - i
-                y_distance = 0 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-            elif matrix_state[i][j] == 4:
-                x_distance = 0 - i
-                y_distance = 1 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-            elif matrix_state[i][j] == 5:
-                x_distance = 1 - i
-                y_distance = 1 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-            elif matrix_state[i][j] == 6:
-                x_distance = 2 - i
-                y_distance = 1 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-            elif matrix_state[i][j] == 7:
-                x_distance = 0 - i
-                y_distance = 2 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-            elif matrix_state[i][j] == 8: 
-                x_distance = 1 - i
-                y_distance = 2 - j
-                if x_distance < 0:
-                    x_distance = x_distance * -1
-                if y_distance < 0:
-                    y_distance = y_distance * -1
-                distance += x_distance + y_distance
-    return distance
-
-def copy_matrix(init_matrix):
-    temp = []
-    for i in range(len(init_matrix)):
-        temp.append([])
-        for j in range(len(init_matrix[0])):
-            temp[i].append(init_matrix[i][j])
-    return temp
-
-
-def successor(init_state):
-    result = []
-
-    if isValidMove(init_state.matrix_state, LEFT):
-        temp_matrix = copy_matrix(init_state.matrix_state)
-        makeMove(temp_matrix, LEFT)
-        temp_state = State(temp_matrix, init_state, LEFT)
-        result.append(temp_state)
-
-    if isValidMove(init_state.matrix_state, RIGHT):
-        temp_matrix = copy_matrix(init_state.matrix_state)
-        makeMove(temp_matrix, RIGHT)
-        temp_state = State(temp_matrix, init_state, RIGHT)
-        result.append(temp_state)
-
-    if isValidMove(init_state.matrix_state, UP):
-        temp_matrix = copy_matrix(init_state.matrix_state)
-        makeMove(temp_matrix, UP)
-        temp_state = State(temp_matrix, init_state, UP)
-        result.append(temp_state)
-
-    if isValidMove(init_state.matrix_state, DOWN):
-        temp_matrix = copy_matrix(init_state.matrix_state)
-        makeMove(temp_matrix, DOWN)
-        temp_state = State(temp_matrix, init_state, DOWN)
-        result.append(temp_state)
-    
-    return result
-
-
-def BFS(init_state):
-    Q = queue.Queue()
-    lvl = queue.Queue()
-    solveBoard = getStartingBoard()
-    Q.put(init_state)
-    lvl.put(init_state)
-    while not Q.empty():
-        checkForQuit()
-        current_state = Q.get()
-
-        if current_state.matrix_state == solveBoard:
-            return current_state
-        
-        result = successor(current_state)
-        
-        for i in range(len(result)):
-            checkForQuit()
-            flag = 0
-            for j in range(lvl.qsize()):
-                checkForQuit()
-                if (result[i].matrix_state == lvl.queue[j].matrix_state):
-                    flag = 1
-                    break
-            if flag == 0:
-                Q.put(result[i])
-                lvl.put(result[i])
-
-    return State([], None, None)
-
-
-def AStar(init_state):
-    solveBoard = getStartingBoard()
-    init_state.f = h(init_state.matrix_state)
-    closed = []
-    Q = [init_state]
-    while len(Q) > 0:
-        current_state = Q.pop(0)
-
-        if current_state.matrix_state == solveBoard:
-            return current_state
-        
-        closed.append(current_state)
-
-        result = successor(current_state)
-        for i in range(len(result)):
-            result[i].g = current_state.g + 1
-            result[i].f = result[i].g + h(result[i].matrix_state)
-            flag = 0
-            for j in range(len(closed)):
-                if result[i].matrix_state == closed[j].matrix_state:
-                    flag = 1
-                    break
-                if flag == 0:
-                    for j in range(len(Q)):
-                        if result[i].matrix_state == Q[j].matrix_state:
-                            flag = 1
-                            if result[i].f < Q[j].f:
-                                Q[j].g = result[i].g
-                                Q[j].f = result[i].f
-                                break
-            if flag == 0:
-                Q.append(result[i])
-        Q.sort(key=lambda x: x.f, reverse=False)
-    return State([], None, None)
-    
-if __name__ == "__main__":
-    main()
+    playMoves(board, [OPPOSITE[move] for move in reversed(allMoves)], "")
+
 
+def startSolve(board, solver, maxSeconds=SOLVESECONDS):
+    # Hand the board to one of the solvers on the worker thread and return the
+    # (future, control, stats, solutions) of the search. ARA* appends the
+    # (length, suboptimality) of every better solution it finds to solutions.
+    control = SearchControl(maxSeconds=maxSeconds, maxMemory=SOLVEMEMORY)
+    stats = SearchStats(timing=True)
+    solutions = []
+    if solver is ARAStar:
+        solver = functools.partial(ARAStar, onSolution=lambda moves, suboptimality: solutions.append((len(moves), suboptimality)))
+    future = SOLVERPOOL.submit(cachedSolve, SOLVECACHE, solver, PUZZLE, makeState(PUZZLE, board), control, stats)
+    future.add_done_callback(postSolveDone)
+    return (future, control, stats, solutions)
 
 
+def postSolveDone(future):
+    # Wake up the main loop, which may be waiting for events, unless the
+    # window was closed while the search ran.
+    try:
+        pygame.event.post(pygame.event.Event(SOLVEDONE))
+    except pygame.error:
+        pass
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Checks every solver in SOLVERS against the 3x3 distance table, the ones
+# guided by h both with the pattern database and with Manhattan distance
+# plus linear conflict:
+#
+#   python -m pytest -q
+#
+# The tables are built in a temporary directory; tables/ is neither read
+# nor written.
+import os, random
+import pytest
+import solver
+
+BOARDS = 8 # seeded random boards per solver
+HEURISTICSOLVERS = ("arastar", "astar", "hdastar", "idastar")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tables(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("tables"))
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(solver, "TABLEDIR", directory)
+        patch.setattr(solver, "DISTFILE", os.path.join(directory, "dist-3x3.bin"))
+        patch.setattr(solver, "DISTTABLE", None)
+        patch.setattr(solver, "DISTTABLE_LOADED", False)
+        patch.setattr(solver, "PUZZLES", {}) # Puzzles that haven't looked for tables yet
+        solver.buildDistanceTable()
+        solver.buildPatternDatabases(3, 3)
+        yield
+
+
+def getTestPuzzle(heuristic):
+    # The 3x3 Puzzle with its pattern database for heuristic "pdb", and
+    # without it, so that h is Manhattan distance plus linear conflict,
+    # for "manhattan".
+    puzzle = solver.getPuzzle(3, 3)
+    puzzle.patternDatabase = solver.loadPatternDatabase(3, 3) if heuristic == "pdb" else None
+    puzzle.patternDatabaseLoaded = True
+    if heuristic == "pdb":
+        assert puzzle.patternDatabase is not None
+    return puzzle
+
+
+def solverCases():
+    # (solver name, heuristic) of every solver, twice for those guided by h.
+    cases = []
+    for solverName in sorted(solver.SOLVERS):
+        if solverName in HEURISTICSOLVERS:
+            cases += [(solverName, "pdb"), (solverName, "manhattan")]
+        else:
+            cases.append((solverName, None))
+    return cases
+
+
+def randomCells(rng, solvable):
+    # Cells of a random 3x3 board that can or can't be solved.
+    puzzle = solver.getPuzzle(3, 3)
+    while True:
+        cells = list(range(9))
+        rng.shuffle(cells)
+        state = solver.parseBoard(puzzle, cells)
+        if solver.isSolvable(puzzle, state.board, state.blank) == solvable:
+            return cells
+
+
+def replay(puzzle, state, moves):
+    # The packed board reached by making moves from state.
+    board, blank = state.board, state.blank
+    for move in moves:
+        newBlank = blank + puzzle.steps[move]
+        assert newBlank in [cell for m, cell in puzzle.neighbors[blank]], "illegal move %s" % move
+        board, blank = solver.slideTile(puzzle, board, blank, newBlank), newBlank
+    return board
+
+
+@pytest.mark.parametrize("solverName, heuristic", solverCases())
+def test_optimal(solverName, heuristic):
+    puzzle = getTestPuzzle(heuristic)
+    if solverName == "layerbfs" and not solver.layerBoardsFit(puzzle):
+        pytest.skip("layerbfs needs NumPy")
+    rng = random.Random(solverName)
+    for i in range(BOARDS):
+        cells = randomCells(rng, True)
+        result = solver.SOLVERS[solverName](puzzle, solver.parseBoard(puzzle, cells))
+        assert result.status == solver.SOLVED, cells
+        assert replay(puzzle, solver.parseBoard(puzzle, cells), result.moves) == puzzle.goalBoard, cells
+        assert len(result.moves) == solver.tableDistance(puzzle, solver.parseBoard(puzzle, cells).board), cells
+
+
+@pytest.mark.parametrize("solverName, heuristic", solverCases())
+def test_unsolvable(solverName, heuristic):
+    puzzle = getTestPuzzle(heuristic)
+    if solverName == "layerbfs" and not solver.layerBoardsFit(puzzle):
+        pytest.skip("layerbfs needs NumPy")
+    rng = random.Random(solverName)
+    # two tiles swapped on the goal, and random boards of the wrong parity
+    boards = [[2, 1, 3, 4, 5, 6, 7, 8, 0]] + [randomCells(rng, False) for i in range(3)]
+    for cells in boards:
+        assert solver.tableDistance(puzzle, solver.parseBoard(puzzle, cells).board) is None
+        assert solver.SOLVERS[solverName](puzzle, solver.parseBoard(puzzle, cells)).status == solver.UNSOLVABLE, cells
+
+
+def test_goal():
+    puzzle = getTestPuzzle("pdb")
+    for solverName, search in sorted(solver.SOLVERS.items()):
+        if solverName == "layerbfs" and not solver.layerBoardsFit(puzzle):
+            continue
+        result = search(puzzle, solver.parseBoard(puzzle, [1, 2, 3, 4, 5, 6, 7, 8, 0]))
+        assert (result.status, result.moves) == (solver.SOLVED, []), solverName
+
+
+@pytest.mark.parametrize("solverName", ["arastar", "astar", "bfs", "bibfs", "idastar"])
+def test_nodeBudget(solverName):
+    # these poll on every expansion once the budget is reached, not just every POLLINTERVAL
+    puzzle = getTestPuzzle("pdb")
+    control = solver.SearchControl(maxNodes=10)
+    result = solver.SOLVERS[solverName](puzzle, solver.parseBoard(puzzle, [8, 6, 7, 2, 5, 4, 3, 0, 1]), control)
+    assert (result.status, result.expanded) == (solver.BUDGET_EXCEEDED, 10)